@@ -0,0 +1,24 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import backend.ingest as ingest, backend.migrations as migrations, backend.parse as parse
+from backend.benchmarks.workbook import write_workbook
+
+# A husky_plan.db filled from a synthetic workbook, built once per (rows, seed) in workdir
+def build_database(workdir: str, rows: int, seed: int = 0) -> str:
+    db_path = os.path.join(workdir, "husky_plan.db")
+    if os.path.exists(db_path):
+        return db_path
+
+    workbook_path = os.path.join(workdir, f"registrar_{rows}_{seed}.xlsx")
+    if not os.path.exists(workbook_path):
+        write_workbook(workbook_path, rows, seed)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    migrations.migrate(engine)
+    with Session(engine) as db:
+        ingest.load_courses(db, parse.snapshot(workbook_path))
+    engine.dispose()
+    return db_path
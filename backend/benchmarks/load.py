@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from backend.benchmarks.fixtures import build_database
+from backend.paths import DB_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def course_keys(db_path: str) -> list[tuple[str, str]]:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute("SELECT subject_code, catalog_number FROM courses").fetchall()
+
+def make_request(endpoint: str, keys: list[tuple[str, str]], rng: random.Random) -> tuple[str, str, dict]:
+    if endpoint == "classes":
+        subject, catalog_number = rng.choice(keys)
+        return "GET", "/classes", {"params": {"subject": subject, "catalog_number": catalog_number}}
+    if endpoint == "batch":
+        courses = [{"subject": s, "catalog_number": c} for s, c in rng.sample(keys, min(len(keys), 6))]
+        return "POST", "/classes/batch", {"json": {"courses": courses}}
+    subject, catalog_number = rng.choice(keys)
+    return "GET", "/search", {"params": {"q": f"{subject} {catalog_number[:2]}"}}
+
+# `clients` concurrent connections working through `total` requests between them
+async def run_load(url: str, endpoint: str, keys: list, clients: int, total: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    requests = [make_request(endpoint, keys, rng) for _ in range(total)]
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        queue = iter(requests)
+
+        async def worker():
+            nonlocal errors
+            for method, path, kwargs in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    if response.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "endpoint": endpoint,
+        "requests": total,
+        "clients": clients,
+        "errors": errors,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "requests_per_second": total / elapsed,
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# Serve the fixture db with uvicorn, its directory is the api's data directory
+def start_server(workdir: str, port: int, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "PYTHONPATH": ROOT, "HUSKY_DATA_DIR": workdir}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("api did not start")
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent load test against the read api")
+    parser.add_argument("--url", help="test a running api instead of starting one on a fixture db")
+    parser.add_argument("--db", help="db to draw course keys from when using --url")
+    parser.add_argument("--rows", type=int, default=5_000, help="fixture workbook rows")
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--endpoint", choices=["classes", "batch", "search"], nargs="+",
+                        default=["classes", "batch", "search"])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        server = None
+        if args.url:
+            url, db_path = args.url, args.db or DB_PATH
+        else:
+            db_path = build_database(workdir, args.rows)
+            port = free_port()
+            server = start_server(workdir, port, args.workers)
+            url = f"http://127.0.0.1:{port}"
+
+        try:
+            keys = course_keys(db_path)
+            for endpoint in args.endpoint:
+                result = asyncio.run(run_load(url, endpoint, keys, args.clients, args.requests))
+                print(
+                    f"{result['endpoint']:<8} {result['requests']} requests / {result['clients']} clients: "
+                    f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms, "
+                    f"{result['requests_per_second']:.0f} req/s, {result['errors']} errors"
+                )
+        finally:
+            if server is not None:
+                stop_server(server)
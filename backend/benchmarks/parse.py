@@ -0,0 +1,81 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import backend.parse as parse
+from backend.benchmarks.process import collect, exit_reason, peak_rss_mb
+from backend.benchmarks.workbook import write_workbook
+from backend.constants.courses import DAYS_OF_WEEK, ClassKeys
+
+# What fetch_courses used to do: read_excel then a replace pass per column
+def legacy_parse(workbook_path: str):
+    data = pd.read_excel(workbook_path, engine="openpyxl", usecols=[key.value for key in ClassKeys])
+    data.replace({ClassKeys.CLASSM_MEETING_TIME_START.value: '.'}, np.nan, inplace=True)
+    data.replace({ClassKeys.CLASSM_MEETING_TIME_END.value: '.'}, np.nan, inplace=True)
+    data.replace({ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value: ' '}, np.nan, inplace=True)
+    data.replace({ClassKeys.CLASSM_INSTRUCTOR_ROLE.value: '.'}, np.nan, inplace=True)
+    data.dropna(inplace=True)
+    for day in DAYS_OF_WEEK:
+        data.replace({day.value: 'Y'}, True, inplace=True)
+        data.replace({day.value: 'N'}, False, inplace=True)
+    for key in (ClassKeys.CLASSM_MEETING_TIME_START, ClassKeys.CLASSM_MEETING_TIME_END):
+        data[key.value] = pd.to_datetime(data[key.value], format='%I:%M:%S %p').dt.time
+    return data
+
+def convert(workbook_path: str):
+    snapshot_path = os.path.splitext(workbook_path)[0] + ".arrow"
+    parse.convert(workbook_path, snapshot_path)
+    return parse.load(snapshot_path)
+
+def load(workbook_path: str):
+    return parse.load(os.path.splitext(workbook_path)[0] + ".arrow")
+
+SCENARIOS = {
+    "read_excel": legacy_parse,
+    "convert": convert,
+    "load_snapshot": load,
+}
+
+def measure(name: str, workbook_path: str, results):
+    start = time.perf_counter()
+    data = SCENARIOS[name](workbook_path)
+    seconds = time.perf_counter() - start
+    results.put({"scenario": name, "seconds": seconds, "peak_rss_mb": peak_rss_mb(), "rows": len(data)})
+
+# Each scenario runs in a fresh process so peak RSS isn't shared between them
+def run(rows: int, workdir: str) -> list[dict]:
+    workbook_path = os.path.join(workdir, f"registrar_{rows}.xlsx")
+    if not os.path.exists(workbook_path):
+        write_workbook(workbook_path, rows)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    measured = []
+    for name in SCENARIOS:
+        process = context.Process(target=measure, args=(name, workbook_path, results))
+        process.start()
+        result = collect(process, results)
+        process.join()
+        measured.append(result or {"scenario": name, "error": exit_reason(process.exitcode)})
+    return measured
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare registrar workbook parse paths")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--workdir", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measured = run(args.rows, args.workdir or tmp)
+    for result in measured:
+        if "error" in result:
+            print(f"{result['scenario']:<14} failed: {result['error']}")
+        else:
+            print(f"{result['scenario']:<14} {result['seconds']:8.2f}s {result['peak_rss_mb']:8.1f} MB peak RSS {result['rows']:>8} rows")
+    sys.exit(1 if any("error" in result for result in measured) else 0)
@@ -0,0 +1,36 @@
+import queue
+import resource
+import sys
+
+# Benchmarks run each scenario in its own spawned process, these measure and collect from them
+
+# VmHWM starts over in each spawned process, ru_maxrss would carry over the parent's
+# peak (ex. building fixtures) on Linux. macOS has no /proc and reports ru_maxrss in bytes.
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+
+# A scenario process's result, or None if it died without putting one (ex. segfault, OOM kill).
+# Blocking on the queue alone would wait forever for a process that's gone.
+def collect(process, results, poll: float = 1.0):
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            if process.exitcode is not None:
+                break
+    # It may have put its result just before exiting
+    try:
+        return results.get(timeout=poll)
+    except queue.Empty:
+        return None
+
+def exit_reason(exitcode: int) -> str:
+    return f"killed by signal {-exitcode}" if exitcode < 0 else f"exited with code {exitcode}"
@@ -0,0 +1,107 @@
+import argparse
+import random
+
+from sqlalchemy import create_engine, text
+
+from backend.paths import DB_PATH
+
+# Synthetic "My Class Schedule" pdfs for the importer, built from sections in a husky_plan.db.
+# Written by hand (plain text objects, Helvetica) so no pdf library is needed to make them.
+
+SECTIONS = text("""
+    SELECT sections.id, sections.section_catalog, sections.instruction_type,
+           courses.subject_code, courses.catalog_number, courses.subject_desc,
+           meetings.days_of_week, meetings.time_start, meetings.time_end, meetings.location
+    FROM sections
+    JOIN courses ON courses.id = sections.course_id
+    LEFT JOIN meetings ON meetings.section_id = sections.id
+    ORDER BY sections.id
+""")
+
+DAY_CODES = {"MONDAY": "Mo", "TUESDAY": "Tu", "WEDNESDAY": "We", "THURSDAY": "Th", "FRIDAY": "Fr",
+             "SATURDAY": "Sa", "SUNDAY": "Su"}
+LINES_PER_PAGE = 60
+
+def clock(value: str | None) -> str:
+    if not value:
+        return "TBA"
+    hour, minute = (int(part) for part in value.split(":")[:2])
+    return f"{(hour - 1) % 12 + 1}:{minute:02d}{'PM' if hour >= 12 else 'AM'}"
+
+def days(value: str | None) -> str:
+    return "".join(code for day, code in DAY_CODES.items() if value and f"CLASSM_{day}" in value) or "TBA"
+
+# The lines of a schedule for `count` random sections, laid out like Student Admin's list view
+def schedule_lines(db_path: str, count: int, seed: int = 0) -> tuple[list[str], list[int]]:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as connection:
+        rows = connection.execute(SECTIONS).all()
+    engine.dispose()
+
+    by_section = {}
+    for row in rows:
+        by_section.setdefault(row.id, []).append(row)
+    chosen = random.Random(seed).sample(sorted(by_section), min(count, len(by_section)))
+
+    lines = ["My Class Schedule", "Fall 2025 | Undergraduate | University of Connecticut", ""]
+    for section_id in chosen:
+        first = by_section[section_id][0]
+        lines += [
+            f"{first.subject_code} {first.catalog_number} - {first.subject_desc}",
+            "Status Units Grading Deadlines",
+            "Enrolled 3.00 Graded",
+            "Class Nbr Section Component Days & Times Room Instructor Start/End Date",
+        ]
+        for number, row in enumerate(by_section[section_id]):
+            prefix = f"{section_id} {row.section_catalog} {row.instruction_type or 'Lecture'}" if number == 0 else ""
+            lines.append(
+                f"{prefix} {days(row.days_of_week)} {clock(row.time_start)} - {clock(row.time_end)} "
+                f"{row.location or 'TBA'} Staff 08/25/2025 - 12/12/2025".strip()
+            )
+        lines.append("")
+    return lines, chosen
+
+def escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def write_pdf(path: str, lines: list[str]):
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in pages:
+        stream = "BT /F1 9 Tf 11 TL 40 760 Td " + " ".join(f"({escape(line)}) Tj T*" for line in page) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode("latin-1", "replace")))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{kid} 0 R" for kid in kids).encode(), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic registration pdf from a catalog db")
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lines, chosen = schedule_lines(args.db, args.sections, args.seed)
+    write_pdf(args.path, lines)
+    print(f"Wrote {args.path} with sections {', '.join(map(str, chosen))}")
@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+import backend.crud as crud, backend.generator as generator, backend.ingest as ingest, backend.metrics as metrics, backend.migrations as migrations, backend.parse as parse, backend.snapshot as snapshot
+from backend.benchmarks.fixtures import build_database
+from backend.benchmarks.process import collect, exit_reason, peak_rss_mb
+from backend.schemas import CourseSchema
+
+# End to end benchmarks on synthetic registrar workbooks, fully offline:
+#   python -m backend.benchmarks.suite --sizes 5000 50000 --output results.json
+#   python -m backend.benchmarks.suite --sizes 5000 --compare results.json   # exits 1 on a regression
+# Every (size, scenario) runs in a fresh process so peak RSS and SQL counts are its own.
+# Workbooks and their ingested dbs are cached in --workdir, building the 200k one takes a while.
+
+SIZES = [5_000, 50_000, 200_000]
+
+def sql_statements() -> int:
+    return int(sum(metrics.sql_statements.values.values()))
+
+def sample_keys(catalog: snapshot.Catalog, count: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    keys = sorted(catalog.courses)
+    return [rng.choice(keys) for _ in range(count)]
+
+def sqlite_engines(db_path: str):
+    engine = create_engine(f"sqlite:///{db_path}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    metrics.instrument(engine)
+    metrics.instrument(async_engine.sync_engine)
+    return engine, async_engine
+
+# Scenarios take (workdir, db_path, workbook_path, options) and return (ops, extra).
+# Only the scenario call is timed, setup done inside it is noted where it matters.
+
+# Registrar workbook to a filled db: convert, load, normalize, diff against nothing, write, index
+def full_ingest(workdir, db_path, workbook_path, options):
+    db_path = os.path.join(workdir, "fresh.db")
+    engine, _ = sqlite_engines(db_path)
+    migrations.migrate(engine)
+    snapshot_path = os.path.join(workdir, "registrar.arrow")
+    timer = ingest.StageTimer()
+    with timer.stage("parse") as stage:
+        parse.convert(workbook_path, snapshot_path)
+        data = parse.load(snapshot_path)
+        stage.rows_out = len(data)
+    with Session(engine) as db:
+        ingest.load_courses(db, data, timer)
+    return len(data), {"stages": timer.timings}
+
+# The same workbook again, nothing changed: the cost of a no-op refresh
+def repeat_ingest(workdir, db_path, workbook_path, options):
+    copy_path = os.path.join(workdir, "repeat.db")
+    shutil.copy(db_path, copy_path)
+    engine, _ = sqlite_engines(copy_path)
+    timer = ingest.StageTimer()
+    with timer.stage("parse") as stage:
+        data = parse.snapshot(workbook_path)
+        stage.rows_out = len(data)
+    with Session(engine) as db:
+        ingest.load_courses(db, data, timer)
+    return len(data), {"stages": timer.timings}
+
+# What the api runs in a thread after every refresh: load, link and measure the snapshot
+def snapshot_build(workdir, db_path, workbook_path, options):
+    engine, _ = sqlite_engines(db_path)
+    catalog = snapshot.load_catalog(1, engine)
+    return len(catalog.courses), {"bytes": catalog.footprint()["total"]}
+
+# One course per call through the async ORM + pydantic, the path /classes took before the snapshot
+def lookup_orm(workdir, db_path, workbook_path, options):
+    _, async_engine = sqlite_engines(db_path)
+    keys = options["keys"]
+
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            for subject, catalog_number in keys:
+                course = await crud.get_course_by_subject_and_catalog_number(db, subject, catalog_number)
+                CourseSchema.model_validate(course).model_dump_json()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    return len(keys), {}
+
+def lookup_snapshot(workdir, db_path, workbook_path, options):
+    catalog = options["catalog"]
+    for subject, catalog_number in options["keys"]:
+        snapshot.dumps(catalog.course(subject, catalog_number).as_dict())
+    return len(options["keys"]), {}
+
+def batches(keys: list, size: int = 10) -> list[list]:
+    return [keys[i:i + size] for i in range(0, len(keys), size)]
+
+def batch_orm(workdir, db_path, workbook_path, options):
+    _, async_engine = sqlite_engines(db_path)
+    groups = batches(options["keys"])
+
+    async def run():
+        async with AsyncSession(async_engine) as db:
+            for keys in groups:
+                courses = await crud.get_courses_by_keys_or_sections(db, keys, [])
+                for course in courses:
+                    CourseSchema.model_validate(course).model_dump_json()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    return len(groups), {}
+
+def batch_snapshot(workdir, db_path, workbook_path, options):
+    groups = batches(options["keys"])
+    for keys in groups:
+        courses = options["catalog"].lookup(keys, [])
+        snapshot.dumps({course.key: course.as_dict() for course in courses})
+    return len(groups), {}
+
+# Every course in the catalog serialized once, objects already in memory
+def serialize_pydantic(workdir, db_path, workbook_path, options):
+    courses = options["orm_courses"]
+    for course in courses:
+        CourseSchema.model_validate(course).model_dump_json()
+    return len(courses), {}
+
+def serialize_snapshot(workdir, db_path, workbook_path, options):
+    courses = list(options["catalog"].courses.values())
+    for course in courses:
+        snapshot.dumps(course.as_dict())
+    return len(courses), {}
+
+# Five random courses per request, like /schedules
+def schedules(workdir, db_path, workbook_path, options):
+    catalog, rng = options["catalog"], random.Random(options["seed"])
+    keys = sorted(catalog.courses)
+    runs = max(len(options["keys"]) // 20, 1)
+    found = 0
+    for _ in range(runs):
+        picked = [catalog.courses[key] for key in rng.sample(keys, min(5, len(keys)))]
+        courses = [generator.build_options(course, generator.Constraints()) for course in picked]
+        found += len(generator.generate(courses, limit=10)[0])
+    return runs, {"schedules": found}
+
+SCENARIOS = {
+    "full_ingest": full_ingest,
+    "repeat_ingest": repeat_ingest,
+    "snapshot_build": snapshot_build,
+    "lookup_orm": lookup_orm,
+    "lookup_snapshot": lookup_snapshot,
+    "batch_orm": batch_orm,
+    "batch_snapshot": batch_snapshot,
+    "serialize_pydantic": serialize_pydantic,
+    "serialize_snapshot": serialize_snapshot,
+    "schedules": schedules,
+}
+
+# Untimed setup some scenarios need: sampled keys, a built snapshot, loaded ORM objects
+def prepare(name: str, db_path: str, lookups: int, seed: int) -> dict:
+    options = {"seed": seed}
+    if name in ("full_ingest", "repeat_ingest", "snapshot_build"):
+        return options
+
+    engine, async_engine = sqlite_engines(db_path)
+    catalog = snapshot.load_catalog(1, engine)
+
+    async def load_orm():
+        async with AsyncSession(async_engine) as db:
+            courses = await crud.get_courses_by_keys_or_sections(db, list(catalog.courses), [])
+        await async_engine.dispose()
+        return courses
+
+    orm_courses = asyncio.run(load_orm()) if name == "serialize_pydantic" else None
+    options.update(catalog=catalog, orm_courses=orm_courses, keys=sample_keys(catalog, lookups, seed))
+    return options
+
+def measure(name: str, rows: int, db_path: str, workbook_path: str, lookups: int, seed: int, results):
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            options = prepare(name, db_path, lookups, seed)
+            rss_before = peak_rss_mb()
+            statements_before = sql_statements()
+            start = time.perf_counter()
+            ops, extra = SCENARIOS[name](workdir, db_path, workbook_path, options)
+            seconds = time.perf_counter() - start
+            results.put({
+                "rows": rows,
+                "scenario": name,
+                "seconds": round(seconds, 4),
+                "ops": ops,
+                "ms_per_op": round(seconds * 1000 / ops, 4) if ops else None,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                # How far the scenario pushed the peak past imports and setup
+                "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+                "sql_statements": sql_statements() - statements_before,
+                **extra,
+            })
+    except Exception as e:
+        results.put({"rows": rows, "scenario": name, "error": repr(e)})
+
+def run(sizes: list[int], scenarios: list[str], workdir: str, lookups: int, seed: int) -> list[dict]:
+    context = multiprocessing.get_context("spawn")
+    measured = []
+    for rows in sizes:
+        size_dir = os.path.join(workdir, f"rows_{rows}_seed_{seed}")
+        os.makedirs(size_dir, exist_ok=True)
+        started = time.perf_counter()
+        db_path = build_database(size_dir, rows, seed)
+        workbook_path = os.path.join(size_dir, f"registrar_{rows}_{seed}.xlsx")
+        print(f"{rows} rows: fixtures ready in {time.perf_counter() - started:.1f}s", flush=True)
+
+        for name in scenarios:
+            results = context.Queue()
+            process = context.Process(target=measure, args=(name, rows, db_path, workbook_path, lookups, seed, results))
+            process.start()
+            result = collect(process, results)
+            process.join()
+            if result is None:
+                result = {"rows": rows, "scenario": name, "error": exit_reason(process.exitcode)}
+            measured.append(result)
+            print(format_result(result), flush=True)
+    return measured
+
+def format_result(result: dict) -> str:
+    if "error" in result:
+        return f"{result['rows']:>7} {result['scenario']:<19} failed: {result['error']}"
+    per_op = f"{result['ms_per_op']:10.3f} ms/op" if result["ms_per_op"] is not None else " " * 16
+    return (
+        f"{result['rows']:>7} {result['scenario']:<19} {result['seconds']:9.3f}s {per_op} "
+        f"{result['peak_rss_mb']:8.1f} MB peak (+{result['rss_growth_mb']:.1f}) {result['sql_statements']:>6} sql"
+    )
+
+def metadata(sizes: list[int], lookups: int, seed: int) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": sizes,
+        "lookups": lookups,
+        "seed": seed,
+    }
+
+# Slower or bigger than the baseline by more than `threshold` (a fraction), or running more SQL.
+# A slowdown also has to exceed `min_seconds`, short scenarios are mostly noise.
+def compare(baseline: dict, results: list[dict], threshold: float, min_seconds: float = 0.1) -> list[str]:
+    previous = {(result["rows"], result["scenario"]): result for result in baseline["results"] if "error" not in result}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["scenario"]))
+        name = f"{result['rows']} {result['scenario']}"
+        if "error" in result:
+            regressions.append(f"{name}: failed ({result['error']})")
+            continue
+        if before is None:
+            continue
+        slower = result["seconds"] - before["seconds"]
+        if slower > min_seconds and result["seconds"] > before["seconds"] * (1 + threshold):
+            regressions.append(f"{name}: {before['seconds']:.3f}s -> {result['seconds']:.3f}s")
+        if result["peak_rss_mb"] > before["peak_rss_mb"] * (1 + threshold):
+            regressions.append(f"{name}: {before['peak_rss_mb']:.1f} MB -> {result['peak_rss_mb']:.1f} MB peak RSS")
+        if result["sql_statements"] > before["sql_statements"]:
+            regressions.append(f"{name}: {before['sql_statements']} -> {result['sql_statements']} sql statements")
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark ingest, lookups, serialization and schedules")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="workbook rows")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--workdir", default="./benchmark_cache", help="where workbooks and dbs are cached")
+    parser.add_argument("--lookups", type=int, default=1_000, help="course lookups per lookup scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as json")
+    parser.add_argument("--compare", help="baseline json to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown/growth, 0.25 = 25%%")
+    parser.add_argument("--min-seconds", type=float, default=0.1, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = run(args.sizes, args.scenarios, args.workdir, args.lookups, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(args.sizes, args.lookups, args.seed), "results": results}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    failed = any("error" in result for result in results)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if not regressions:
+            print(f"No regressions against {args.compare} (threshold {args.threshold:.0%})")
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,104 @@
+import random
+
+import openpyxl
+
+from backend.constants.courses import DAYS_OF_WEEK, ClassKeys
+
+SUBJECTS = {
+    "CSE": "Computer Science & Engineering",
+    "MATH": "Mathematics",
+    "PHYS": "Physics",
+    "CHEM": "Chemistry",
+    "ENGL": "English",
+    "HIST": "History",
+    "ECON": "Economics",
+    "BIOL": "Biology",
+}
+CAMPUSES = ["Storrs"] * 8 + ["Stamford", "Hartford"]
+PATTERNS = [
+    ["Y", "N", "Y", "N", "Y", "N", "N"],
+    ["N", "Y", "N", "Y", "N", "N", "N"],
+    ["Y", "N", "Y", "N", "N", "N", "N"],
+    ["N", "N", "N", "N", "Y", "N", "N"],
+    ["N", "N", "N", "N", "N", "N", "N"],
+]
+STARTS = ["08:00:00 AM", "09:05:00 AM", "10:10:00 AM", "11:15:00 AM", "12:20:00 PM", "01:25:00 PM",
+          "02:30:00 PM", "03:35:00 PM", "05:00:00 PM", "."]
+BUILDINGS = ["OAK", "MONT", "ITE", "GENT", "LH", "BUSN", "ARJ"]
+
+def time_end(start: str, minutes: int) -> str:
+    if start == ".":
+        return "."
+    clock, meridiem = start.split(" ")
+    hour, minute, _ = (int(part) for part in clock.split(":"))
+    total = (hour % 12 + (12 if meridiem == "PM" else 0)) * 60 + minute + minutes
+    hour, minute = divmod(total, 60)
+    return f"{(hour - 1) % 12 + 1:02d}:{minute:02d}:00 {'PM' if hour >= 12 else 'AM'}"
+
+# Rows shaped like the registrar's export: one row per (section, instructor, meeting)
+def generate_rows(rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    instructors = [(f"{rng.randint(1000000, 9999999)}", f"Instructor {i}") for i in range(max(rows // 20, 10))]
+    class_nbr = 10000
+    produced = 0
+    while produced < rows:
+        subject = rng.choice(list(SUBJECTS))
+        catalog = str(rng.randint(1000, 4999))
+        course_id = str(rng.randint(1, 99999)).zfill(6)
+        credits = rng.choice([1, 3, 3, 3, 4])
+        for section in range(rng.randint(1, 6)):
+            class_nbr += 1
+            campus = rng.choice(CAMPUSES)
+            cap = rng.choice([19, 30, 45, 120, 300])
+            section_instructors = rng.sample(instructors, rng.choice([1, 1, 1, 2, 3]))
+            meetings = []
+            for _ in range(rng.choice([1, 1, 2])):
+                start = rng.choice(STARTS)
+                meetings.append((rng.choice(PATTERNS), start, time_end(start, rng.choice([50, 75, 110])),
+                                 f"{rng.choice(BUILDINGS)} {rng.randint(100, 499)}"))
+            for emplid, name in section_instructors:
+                role = rng.choice(["PI", "PI", "SI", "TA"])
+                for days, start, end, location in meetings:
+                    row = {
+                        ClassKeys.CLASS_TERM_LDESC: "Fall 2025",
+                        ClassKeys.CLASS_SESSION_LDESC: "Regular Academic",
+                        ClassKeys.CLASS_ACAD_ORG_LDESC: SUBJECTS[subject],
+                        ClassKeys.CLASS_CAMPUS_LDESC: campus,
+                        ClassKeys.CLASS_CLASS_NBR: class_nbr,
+                        ClassKeys.CLASS_COURSE_ID: course_id,
+                        ClassKeys.CLASS_SUBJECT_LDESC: SUBJECTS[subject],
+                        ClassKeys.CLASS_SUBJECT_CD: subject,
+                        ClassKeys.CLASS_CATALOG_NBR: catalog,
+                        ClassKeys.CLASS_SECTION: f"{section + 1:03d}",
+                        ClassKeys.CLASS_COMPONENT_LDESC: "Lecture",
+                        ClassKeys.CLASS_COMPONENT_CD: "LEC",
+                        ClassKeys.CASSC_UNITS_MINIMUM: credits,
+                        ClassKeys.CASSC_UNITS_MAXIMUM: credits,
+                        ClassKeys.CLASS_DESCR: f"Topics in {SUBJECTS[subject]} {catalog}",
+                        ClassKeys.CLASSM_MEETING_TIME_START: start,
+                        ClassKeys.CLASSM_MEETING_TIME_END: end,
+                        ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID: emplid if rng.random() > 0.02 else " ",
+                        ClassKeys.Define_CLASSM_INSTRUCTOR_NAME: name,
+                        ClassKeys.CLASSM_INSTRUCTOR_ROLE: role,
+                        ClassKeys.CLASS_INSTRUCTION_MODE_LDESC: rng.choice(["In Person", "In Person", "Online"]),
+                        ClassKeys.CLASSM_FACILITY_LDESC: location,
+                        ClassKeys.CLASS_ENRL_CAP: cap,
+                        ClassKeys.CLASS_ENRL_TOT: rng.randint(0, cap),
+                        ClassKeys.CLASS_WAIT_CAP: cap // 10,
+                        ClassKeys.CLASS_WAIT_TOT: rng.randint(0, cap // 10),
+                    }
+                    for day, flag in zip(DAYS_OF_WEEK, days):
+                        row[day] = flag
+                    yield [row[key] for key in ClassKeys]
+                    produced += 1
+                    if produced >= rows:
+                        return
+
+# Write a synthetic registrar workbook with the ClassKeys columns
+def write_workbook(path: str, rows: int, seed: int = 0):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([key.value for key in ClassKeys])
+    for row in generate_rows(rows, seed):
+        sheet.append(row)
+    workbook.save(path)
@@ -0,0 +1,123 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+from typing import Awaitable, Callable, Hashable, Optional
+
+from backend.paths import data_path
+
+logger = logging.getLogger('uvicorn.error')
+
+# The worker bumps this after every refresh, the api compares it to decide if its cache is stale.
+# It's a file so checking it is a stat() instead of a query.
+VERSION_PATH = os.environ.get("HUSKY_VERSION_PATH", data_path("husky_plan.version"))
+
+def bump_version(path: str = VERSION_PATH) -> int:
+    version = read_version(path) + 1
+    with open(path + ".tmp", "w") as f:
+        f.write(str(version))
+    os.replace(path + ".tmp", path)
+    return version
+
+def read_version(path: str = VERSION_PATH) -> int:
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+# Only re-reads the version file when its mtime changes
+class CatalogVersion:
+    def __init__(self, path: str = VERSION_PATH):
+        self.path = path
+        self.mtime = None
+        self.version = 0
+
+    def current(self) -> int:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self.mtime:
+            self.mtime = mtime
+            self.version = read_version(self.path)
+        return self.version
+
+class CachedResponse:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        # Content based, so a refresh that didn't touch this course still answers 304
+        self.etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+# LRU of serialized responses keyed by (catalog version, *key).
+# A miss is cached too (as None) so unknown courses don't hit the db on every request.
+# Lives on the api's event loop, concurrent misses on the same key share one load.
+# `version` is anything with a current() -> int, ex. the version of the snapshot being served.
+class ResponseCache:
+    def __init__(self, loader: Callable[..., Awaitable[Optional[bytes]]], maxsize: int = 2048,
+                 version=None):
+        self.loader = loader
+        self.maxsize = maxsize
+        self.version = version or CatalogVersion()
+        self.entries: OrderedDict[tuple, Optional[CachedResponse]] = OrderedDict()
+        self.pending: dict[tuple, asyncio.Future] = {}
+        self.loaded_version = None
+        self.warming: asyncio.Task | None = None
+
+    async def lookup(self, *key: Hashable) -> Optional[CachedResponse]:
+        version = self.version.current()
+        if version != self.loaded_version:
+            self.rollover(version)
+
+        entry_key = (version, *key)
+        if entry_key in self.entries:
+            self.entries.move_to_end(entry_key)
+            return self.entries[entry_key]
+
+        return await self.load(entry_key)
+
+    async def load(self, entry_key: tuple) -> Optional[CachedResponse]:
+        if entry_key in self.pending:
+            return await asyncio.shield(self.pending[entry_key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[entry_key] = future
+        try:
+            body = await self.loader(*entry_key[1:])
+            response = None if body is None else CachedResponse(body)
+            if entry_key[0] == self.loaded_version:
+                self.entries[entry_key] = response
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting, don't let asyncio warn about it
+            future.exception()
+            raise
+        finally:
+            del self.pending[entry_key]
+
+    # A new catalog landed: drop the old entries and reload the ones that were hot, in the background
+    def rollover(self, version: int):
+        hot = [entry_key[1:] for entry_key in reversed(self.entries)]
+        self.entries.clear()
+        self.loaded_version = version
+
+        if hot:
+            self.warming = asyncio.get_running_loop().create_task(self.warm(version, hot))
+
+    async def warm(self, version: int, keys: list[tuple]):
+        try:
+            for key in keys:
+                if self.loaded_version != version:
+                    return
+                if (version, *key) not in self.entries:
+                    await self.load((version, *key))
+            logger.debug(f"Warmed {len(keys)} cached responses for catalog version {version}")
+        except Exception as e:
+            logger.exception(e)
@@ -33,4 +33,16 @@ class ClassKeys(Enum):
     CLASS_ENRL_CAP = "CLASS_ENRL_CAP"
     CLASS_ENRL_TOT = "CLASS_ENRL_TOT"
     CLASS_WAIT_CAP = "CLASS_WAIT_CAP"
-    CLASS_WAIT_TOT = "CLASS_WAIT_TOT"
\ No newline at end of file
+    CLASS_WAIT_TOT = "CLASS_WAIT_TOT"
+
+
+# Monday first, a day's index is also its bit in the days bitmask
+DAYS_OF_WEEK = [
+    ClassKeys.CLASSM_MONDAY,
+    ClassKeys.CLASSM_TUESDAY,
+    ClassKeys.CLASSM_WEDNESDAY,
+    ClassKeys.CLASSM_THURSDAY,
+    ClassKeys.CLASSM_FRIDAY,
+    ClassKeys.CLASSM_SATURDAY,
+    ClassKeys.CLASSM_SUNDAY,
+]
@@ -1,21 +1,44 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from backend.models import Course, Section, SectionProfessor
 
-# Getting course with sections by course id
-def get_course_by_subject_and_catalog_number(db: Session, subject: str, catalog_number: str):
+# Sections, their professors and meetings are each loaded with one IN query per table, so
+# rows aren't multiplied like a chain of joins would, and nothing lazy loads (async can't)
+def course_options():
     return (
-        db.query(Course)
-        .options(
-            joinedload(Course.sections)
-            .joinedload(Section.professors)
-            .joinedload(SectionProfessor.professor),
-            joinedload(Course.sections)
-            .joinedload(Section.meetings)
-        )
-        .filter((Course.subject_code == subject) & (Course.catalog_number == catalog_number))
-        .first()
+        selectinload(Course.sections)
+        .selectinload(Section.professors)
+        .selectinload(SectionProfessor.professor),
+        selectinload(Course.sections)
+        .selectinload(Section.meetings)
     )
 
+# Getting course with sections by course id
+async def get_course_by_subject_and_catalog_number(db: AsyncSession, subject: str, catalog_number: str):
+    return (
+        await db.scalars(
+            select(Course)
+            .options(*course_options())
+            .where((Course.subject_code == subject) & (Course.catalog_number == catalog_number))
+        )
+    ).first()
 
+# Getting many courses with their sections at once. selectinload keeps this at one query
+# per table no matter how many courses are asked for
+async def get_courses_by_keys_or_sections(db: AsyncSession, keys: list[tuple[str, str]], section_ids: list[int]):
+    filters = []
+    if keys:
+        filters.append(tuple_(Course.subject_code, Course.catalog_number).in_(keys))
+    if section_ids:
+        filters.append(Course.id.in_(select(Section.course_id).where(Section.id.in_(section_ids))))
+    if not filters:
+        return []
 
-
+    return (
+        await db.scalars(
+            select(Course)
+            .options(*course_options())
+            .where(or_(*filters))
+        )
+    ).all()
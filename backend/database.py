@@ -1,15 +1,51 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# using sqllite, so this just creates a local file
-SQLALCHEMY_DATABASE_URL = "sqlite:///./husky_plan.db"
+from backend.paths import DB_PATH
+
+# using sqllite, so this just creates a local file in the data directory
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+
+# The api reads the same file through its own async engine. Both are sqlite only,
+# search (FTS5) and the migration checks (EXPLAIN QUERY PLAN) depend on it.
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+POOL_SIZE = int(os.environ.get("HUSKY_DB_POOL_SIZE", 10))
+MAX_OVERFLOW = int(os.environ.get("HUSKY_DB_MAX_OVERFLOW", 20))
 
 # note: check_same_thread only needed for sqllite
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_pre_ping=True
+)
+
+# WAL lets /classes keep reading while the worker writes a refresh, and NORMAL sync is
+# safe under WAL (a crash can only lose the last commit, never corrupt the file)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative is KiB
+    "temp_store": "MEMORY",
+}
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+for sqlite_engine in (engine, async_engine.sync_engine):
+    event.listen(sqlite_engine, "connect", set_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from backend.paths import data_path
+
+logger = logging.getLogger('uvicorn.error')
+
+REGISTRAR_URL = "https://files.registrar.uconn.edu/registrar_public/All_Classes_Table_Format_Fall.xlsx"
+
+# Downloaded workbooks are stored by content hash next to the db
+CACHE_DIR = os.environ.get("HUSKY_CACHE_DIR", data_path("registrar_cache"))
+STATE_FILE = "state.json"
+CHUNK_SIZE = 1 << 16
+
+# One pooled session so every refresh reuses the same keep-alive connection
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# A workbook on disk that hasn't been loaded into the db yet
+class Download:
+    def __init__(self, url: str, path: str, digest: str, etag: str | None, last_modified: str | None):
+        self.url = url
+        self.path = path
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+
+def load_state(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, STATE_FILE)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(cache_dir: str, state: dict):
+    path = os.path.join(cache_dir, STATE_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def snapshot_path(cache_dir: str, digest: str) -> str:
+    return os.path.join(cache_dir, f"{digest}.xlsx")
+
+# Returns None when the registrar's copy hasn't changed since the last successful load.
+# The state only says what was loaded into *some* db, force skips it when ours has nothing.
+def download(url: str = REGISTRAR_URL, cache_dir: str = CACHE_DIR, timeout: float = 60, force: bool = False) -> Download | None:
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = {} if force else load_state(cache_dir).get(url, {})
+
+    # Only ask for a conditional response if we still have the file it refers to
+    headers = {}
+    if previous.get("digest") and os.path.exists(snapshot_path(cache_dir, previous["digest"])):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            logger.debug("Registrar workbook not modified")
+            return None
+        response.raise_for_status()
+
+        # Stream straight to disk, hashing as we go
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    f.write(chunk)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    digest = digest.hexdigest()
+    path = snapshot_path(cache_dir, digest)
+    os.replace(tmp_path, path)
+
+    if digest == previous.get("digest"):
+        logger.debug("Registrar workbook unchanged (%s)", digest[:12])
+        mark_loaded(Download(url, path, digest, etag, last_modified), cache_dir)
+        return None
+
+    return Download(url, path, digest, etag, last_modified)
+
+# Remember what we loaded so the next download can be skipped, and drop older workbooks
+def mark_loaded(download: Download, cache_dir: str = CACHE_DIR):
+    state = load_state(cache_dir)
+    previous = state.get(download.url, {}).get("digest")
+    state[download.url] = {
+        "digest": download.digest,
+        "etag": download.etag,
+        "last_modified": download.last_modified,
+    }
+    save_state(cache_dir, state)
+
+    # The parsed .arrow snapshot shares the workbook's name
+    if previous and previous != download.digest:
+        stale = os.path.splitext(snapshot_path(cache_dir, previous))[0]
+        for suffix in (".xlsx", ".arrow"):
+            try:
+                os.remove(stale + suffix)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import time
+
+from backend.constants.courses import DAYS_OF_WEEK
+from backend.snapshot import Course, Section
+
+# A week is 7 days of 5 minute slots packed into one int, bit (day * SLOTS_PER_DAY + slot).
+# Two sections conflict when their masks share a bit, so a conflict check is a single AND.
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+def meeting_mask(days: tuple[int, ...], start: int, end: int) -> int:
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)
+    block = ((1 << (last - first)) - 1) << first
+    mask = 0
+    for day in days:
+        mask |= block << (day * SLOTS_PER_DAY)
+    return mask
+
+# Grow every block by `slots` on both sides, anything landing in the padding is too close
+def pad(mask: int, slots: int) -> int:
+    padded = mask
+    for shift in range(1, slots + 1):
+        padded |= (mask << shift) | (mask >> shift)
+    return padded
+
+# (day, first slot, end slot) for every day a mask has classes on
+def day_ranges(mask: int) -> tuple[tuple[int, int, int], ...]:
+    ranges = []
+    for day in range(len(DAYS_OF_WEEK)):
+        slots = (mask >> (day * SLOTS_PER_DAY)) & DAY_MASK
+        if slots:
+            ranges.append((day, (slots & -slots).bit_length() - 1, slots.bit_length()))
+    return tuple(ranges)
+
+class Constraints:
+    def __init__(self, earliest_start: int | None = None, blocked_days: set[int] = frozenset(),
+                 min_gap: int = 0, open_seats_only: bool = False):
+        self.earliest_start = earliest_start
+        self.blocked_days = blocked_days
+        self.min_gap = min_gap
+        self.open_seats_only = open_seats_only
+
+    def allows_section(self, section: Section) -> bool:
+        if self.open_seats_only:
+            if section.enrollment_cap is None or section.enrollment_total is None:
+                return False
+            if section.enrollment_total >= section.enrollment_cap:
+                return False
+        return True
+
+    def allows_meeting(self, days: tuple[int, ...], start: int) -> bool:
+        if self.earliest_start is not None and start < self.earliest_start:
+            return False
+        return not self.blocked_days.intersection(days)
+
+# Sections of a course that meet at exactly the same times are interchangeable for the search
+class Option:
+    __slots__ = ("mask", "padded", "days", "section_ids")
+
+    def __init__(self, mask: int, padded: int, section_ids: list[int]):
+        self.mask = mask
+        self.padded = padded
+        self.days = day_ranges(mask)
+        self.section_ids = section_ids
+
+class CourseOptions:
+    __slots__ = ("key", "options")
+
+    def __init__(self, key: str, options: list[Option]):
+        self.key = key
+        self.options = options
+
+def build_options(course: Course, constraints: Constraints) -> CourseOptions:
+    by_mask: dict[int, list[int]] = {}
+    for section in course.sections:
+        if not constraints.allows_section(section):
+            continue
+        mask = 0
+        allowed = True
+        for meeting in section.meetings:
+            if meeting.start is None or meeting.end is None:
+                continue
+            if not constraints.allows_meeting(meeting.day_indexes, meeting.start):
+                allowed = False
+                break
+            mask |= meeting_mask(meeting.day_indexes, meeting.start, meeting.end)
+        if allowed:
+            by_mask.setdefault(mask, []).append(section.id)
+
+    gap_slots = -(-constraints.min_gap // SLOT_MINUTES)
+    options = [Option(mask, pad(mask, gap_slots), sorted(ids)) for mask, ids in by_mask.items()]
+    return CourseOptions(course.key, options)
+
+class Schedule:
+    __slots__ = ("minutes", "choices")
+
+    def __init__(self, minutes: int, choices: list[tuple[str, Option]]):
+        self.minutes = minutes
+        self.choices = choices
+
+# Time on campus is each day's first class start to last class end. The day's current
+# first/last slots are kept in two lists so adding an option only looks at the days it meets.
+def added_slots(option: Option, firsts: list, lasts: list) -> int:
+    added = 0
+    for day, first, last in option.days:
+        if firsts[day] is None:
+            added += last - first
+        else:
+            added += max(last, lasts[day]) - min(first, firsts[day]) - (lasts[day] - firsts[day])
+    return added
+
+# Backtracking search for the `limit` schedules with the least time on campus.
+# Time on campus never shrinks as sections are added, so a partial schedule plus the least
+# any remaining course must add is a lower bound; once that can't beat the current k-th best
+# the whole branch is dropped. Stops at `time_budget` seconds with the best found so far,
+# complete is False then and the schedules may not be the best ones.
+def generate(courses: list[CourseOptions], limit: int = 10, time_budget: float = 0.1) -> tuple[list[Schedule], bool]:
+    deadline = time.perf_counter() + time_budget
+    best: list[tuple[int, int, list]] = []  # max heap on slots via negation
+    counter = itertools.count()
+    days = len(DAYS_OF_WEEK)
+    complete = True
+
+    def search(remaining: list[CourseOptions], padded: int, firsts: list, lasts: list, slots: int, chosen: list):
+        nonlocal complete
+        if not complete or time.perf_counter() > deadline:
+            complete = False
+            return
+        if not remaining:
+            entry = (-slots, next(counter), list(chosen))
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            else:
+                heapq.heappushpop(best, entry)
+            return
+
+        worst = -best[0][0] if len(best) == limit else None
+
+        # Most constrained course first, and give up as soon as any course has nothing left
+        # or can't fit without pushing us past the worst schedule we'd keep
+        pick, candidates, bound = None, None, 0
+        for course in remaining:
+            compatible = [
+                (added_slots(option, firsts, lasts), option)
+                for option in course.options if not option.mask & padded
+            ]
+            if not compatible:
+                return
+            bound = max(bound, min(added for added, _ in compatible))
+            if worst is not None and slots + bound >= worst:
+                return
+            if candidates is None or len(compatible) < len(candidates):
+                pick, candidates = course, compatible
+        rest = [course for course in remaining if course is not pick]
+
+        candidates.sort(key=lambda pair: pair[0])
+        for added, option in candidates:
+            if len(best) == limit and slots + max(added, bound) >= -best[0][0]:
+                break
+            next_firsts, next_lasts = firsts[:], lasts[:]
+            for day, first, last in option.days:
+                next_firsts[day] = first if next_firsts[day] is None else min(first, next_firsts[day])
+                next_lasts[day] = last if next_lasts[day] is None else max(last, next_lasts[day])
+            chosen.append((pick.key, option))
+            search(rest, padded | option.padded, next_firsts, next_lasts, slots + added, chosen)
+            chosen.pop()
+
+    search(courses, 0, [None] * days, [None] * days, 0, [])
+    schedules = [
+        Schedule(-slots * SLOT_MINUTES, choices)
+        for slots, _, choices in sorted(best, reverse=True)
+    ]
+    return schedules, complete
@@ -0,0 +1,111 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import AsyncIterable, Optional
+from zoneinfo import ZoneInfo
+
+from backend.snapshot import Meeting, Section
+
+# Every time in the catalog is Storrs local time
+TZID = "America/New_York"
+ZONE = ZoneInfo(TZID)
+BYDAY = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+HEADER = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Husky Plan//Schedule Export//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Husky Plan",
+    "BEGIN:VTIMEZONE",
+    f"TZID:{TZID}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:-0500",
+    "TZOFFSETTO:-0400",
+    "TZNAME:EDT",
+    "DTSTART:19700308T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:-0400",
+    "TZOFFSETTO:-0500",
+    "TZNAME:EST",
+    "DTSTART:19701101T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+]).encode() + b"\r\n"
+
+FOOTER = b"END:VCALENDAR\r\n"
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+# Content lines longer than 75 octets are continued on the next line after a space (RFC 5545 3.1)
+def fold(line: str) -> bytes:
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return encoded + b"\r\n"
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        # Don't split a multi-byte character
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end])
+        start = end
+    return b"\r\n ".join(parts) + b"\r\n"
+
+def local(day: date, minutes: int) -> str:
+    return f"{day:%Y%m%d}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+# First day on or after term_start the meeting happens
+def first_day(meeting: Meeting, term_start: date) -> date:
+    return min(
+        term_start + timedelta(days=(weekday - term_start.weekday()) % 7)
+        for weekday in meeting.day_indexes
+    )
+
+# One weekly VEVENT per meeting, repeating until the end of the term's last day.
+# None when the section has nothing scheduled inside the term.
+def section_events(section: Section, term_start: date, term_end: date) -> Optional[bytes]:
+    # UNTIL has to be in UTC when DTSTART has a TZID
+    until = datetime.combine(term_end, time(23, 59, 59), ZONE).astimezone(timezone.utc)
+    stamp = datetime.now(timezone.utc)
+    course = section.course
+    professors = ", ".join(link.professor.name for link in section.professors if link.professor.name)
+
+    events = []
+    for number, meeting in enumerate(section.meetings):
+        if meeting.start is None or meeting.end is None or not meeting.day_indexes:
+            continue
+        first = first_day(meeting, term_start)
+        if first > term_end:
+            continue
+        summary = f"{course.key} {section.instruction_type or 'Class'} {section.section_catalog}"
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{section.id}-{number}-{term_start:%Y%m%d}@huskyplan",
+            f"DTSTAMP:{stamp:%Y%m%dT%H%M%SZ}",
+            f"DTSTART;TZID={TZID}:{local(first, meeting.start)}",
+            f"DTEND;TZID={TZID}:{local(first, meeting.end)}",
+            f"RRULE:FREQ=WEEKLY;BYDAY={','.join(BYDAY[day] for day in meeting.day_indexes)};UNTIL={until:%Y%m%dT%H%M%SZ}",
+            f"SUMMARY:{escape(summary)}",
+        ]
+        if meeting.location:
+            lines.append(f"LOCATION:{escape(meeting.location)}")
+        description = f"{course.subject_desc or course.subject_code} {course.catalog_number}, class {section.id}"
+        if professors:
+            description += f"\n{professors}"
+        lines.append(f"DESCRIPTION:{escape(description)}")
+        lines.append("END:VEVENT")
+        events.append(b"".join(fold(line) for line in lines))
+
+    return b"".join(events) if events else None
+
+# The whole calendar, one section at a time, so nothing but a single section's events is held at once
+async def stream_calendar(fragments: AsyncIterable[Optional[bytes]]):
+    yield HEADER
+    async for fragment in fragments:
+        if fragment is not None:
+            yield fragment
+    yield FOOTER
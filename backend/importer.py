@@ -0,0 +1,215 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import re
+import signal
+import tempfile
+from typing import Optional
+
+import pdfplumber
+
+from backend.snapshot import Catalog, Section
+
+# Pulls a student's classes out of their registration pdf (Student Admin's "My Class Schedule").
+# pdf parsing is slow and pure python, so pages are extracted in a pool of worker processes
+# and the api's event loop only waits on them.
+
+MAX_UPLOAD_BYTES = int(os.environ.get("HUSKY_IMPORT_MAX_BYTES", 5 * 1024 * 1024))
+MAX_PAGES = int(os.environ.get("HUSKY_IMPORT_MAX_PAGES", 20))
+# Seconds an upload gets from start to finish, including waiting for a free worker
+TIME_BUDGET = float(os.environ.get("HUSKY_IMPORT_TIME_BUDGET", 10))
+WORKERS = int(os.environ.get("HUSKY_IMPORT_WORKERS", os.cpu_count() or 1))
+
+class UnreadablePdf(Exception):
+    pass
+
+class PdfTooLarge(Exception):
+    pass
+
+class ImportTimeout(Exception):
+    pass
+
+class ReaderCrashed(Exception):
+    pass
+
+# ex. "CSE 1010", "MATH 2110Q", "ENGL 1007-010"
+COURSE = re.compile(r"\b([A-Z]{2,4})\s?(\d{4}[A-Z]{0,2})(?:-(\d{3}[A-Z]?))?\b")
+# A class number (CLASS_CLASS_NBR), optionally followed by its section. Dates and times are not.
+CLASS_NUMBER = re.compile(r"(?<![\d/:.\-])(\d{4,5})(?![\d/:.])(?:\s+(\d{3}[A-Z]?)\b)?")
+SECTION_LABEL = re.compile(r"\bSec(?:tion)?\.?\s*:?\s*(\d{3}[A-Z]?)\b", re.IGNORECASE)
+# ex. "Fall 2025", the year is not a class number
+TERM = re.compile(r"\b(?:Fall|Spring|Summer|Winter|Intersession)\s+\d{4}\b", re.IGNORECASE)
+
+# One line of a page: the course code on it, if any, and the class numbers / sections it mentions
+class Line:
+    __slots__ = ("course", "class_numbers", "sections")
+
+    def __init__(self, course: Optional[tuple[str, str]], class_numbers: list[int], sections: list[str]):
+        self.course = course
+        self.class_numbers = class_numbers
+        self.sections = sections
+
+def blank(text: str, match: re.Match) -> str:
+    return text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+# Class numbers share a range with years, a lone 19xx/20xx only counts when a section follows it
+def looks_like_year(number: int, section: str) -> bool:
+    return not section and 1900 <= number < 2100
+
+def parse_line(text: str) -> Optional[Line]:
+    course, sections = None, []
+    for term in TERM.finditer(text):
+        text = blank(text, term)
+    match = COURSE.search(text)
+    if match:
+        course = (match.group(1), match.group(2))
+        if match.group(3):
+            sections.append(match.group(3))
+        # Catalog numbers look like class numbers, don't read them twice
+        text = blank(text, match)
+
+    class_numbers = []
+    for number, section in CLASS_NUMBER.findall(text):
+        if looks_like_year(int(number), section):
+            continue
+        class_numbers.append(int(number))
+        if section:
+            sections.append(section)
+    sections.extend(SECTION_LABEL.findall(text))
+
+    if course is None and not class_numbers and not sections:
+        return None
+    return Line(course, class_numbers, sections)
+
+# Runs in the worker processes
+def init_worker():
+    def on_alarm(signum, frame):
+        raise TimeoutError("page took too long to extract")
+    signal.signal(signal.SIGALRM, on_alarm)
+
+def page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+def extract_page(path: str, page_number: int) -> list[Line]:
+    # The api stops waiting after TIME_BUDGET, this makes sure the worker stops too
+    signal.setitimer(signal.ITIMER_REAL, TIME_BUDGET)
+    try:
+        with pdfplumber.open(path, pages=[page_number + 1]) as pdf:
+            text = pdf.pages[0].extract_text() or ""
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return [line for line in map(parse_line, text.splitlines()) if line is not None]
+
+pool: Optional[ProcessPoolExecutor] = None
+
+# Started on the first upload, spawned rather than forked since the api already runs threads
+def get_pool() -> ProcessPoolExecutor:
+    global pool
+    if pool is None:
+        pool = ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            # pdfminer holds on to memory, recycle workers every so often
+            max_tasks_per_child=200,
+        )
+    return pool
+
+def shutdown():
+    global pool
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = None
+
+# A pool with a dead worker (OOM killed, or pdfminer crashed on a hostile pdf) is broken for good.
+# Only drop it if it's still the current one, another upload may have replaced it already.
+def discard(executor: ProcessPoolExecutor):
+    global pool
+    executor.shutdown(wait=False, cancel_futures=True)
+    if pool is executor:
+        pool = None
+
+async def read_pages(executor: ProcessPoolExecutor, path: str) -> list[list[Line]]:
+    loop = asyncio.get_running_loop()
+    pages = await loop.run_in_executor(executor, page_count, path)
+    if pages > MAX_PAGES:
+        raise PdfTooLarge(f"pdf has more than {MAX_PAGES} pages")
+    return await asyncio.gather(*(
+        loop.run_in_executor(executor, extract_page, path, page_number)
+        for page_number in range(pages)
+    ))
+
+# Every page is extracted in parallel. The whole upload shares one time budget, so a burst of
+# uploads that outgrows the pool fails fast instead of queueing behind each other forever.
+# A broken pool is replaced and the upload retried once, the worker may have died on an
+# earlier upload. If it breaks again this pdf is likely what crashes it.
+async def extract(data: bytes) -> list[Line]:
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise PdfTooLarge(f"pdf is larger than {MAX_UPLOAD_BYTES // 1024 // 1024}MB")
+    if not data.startswith(b"%PDF"):
+        raise UnreadablePdf("not a pdf")
+
+    # Workers get a path instead of the bytes so a page task doesn't copy the whole upload
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as upload:
+        upload.write(data)
+        upload.flush()
+        try:
+            async with asyncio.timeout(TIME_BUDGET):
+                for attempt in range(2):
+                    executor = get_pool()
+                    try:
+                        results = await read_pages(executor, upload.name)
+                        break
+                    except BrokenProcessPool:
+                        discard(executor)
+                        if attempt:
+                            raise
+        except TimeoutError:
+            raise ImportTimeout(f"pdf took longer than {TIME_BUDGET:g}s to read")
+        except PdfTooLarge:
+            raise
+        except BrokenProcessPool as e:
+            raise ReaderCrashed("the pdf reader crashed, try again") from e
+        except Exception as e:
+            raise UnreadablePdf(str(e)) from e
+
+    return [line for page in results for line in page]
+
+# Match extracted lines against the catalog. A line belongs to the last course code seen above
+# it, even across pages. Class numbers are trusted when they belong to that course, otherwise
+# the course's section with a matching section number is used. Nothing above the first course
+# code (the page header) is matched.
+def match(catalog: Catalog, lines: list[Line]) -> tuple[list[Section], list[str]]:
+    matched: dict[int, Section] = {}
+    seen_courses: dict[tuple[str, str], bool] = {}
+    course = None
+    for line in lines:
+        if line.course is not None:
+            course = line.course
+            seen_courses.setdefault(course, False)
+
+        if course is None:
+            continue
+
+        found = False
+        for class_number in line.class_numbers:
+            section = catalog.sections.get(class_number)
+            if section is not None and (section.course.subject_code, section.course.catalog_number) == course:
+                matched[section.id] = section
+                found = True
+
+        if not found and line.sections:
+            catalog_course = catalog.course(*course)
+            if catalog_course is not None:
+                for section in catalog_course.sections:
+                    if section.section_catalog in line.sections:
+                        matched[section.id] = section
+                        found = True
+
+    for section in matched.values():
+        seen_courses[(section.course.subject_code, section.course.catalog_number)] = True
+    unmatched = [f"{subject} {catalog_number}" for (subject, catalog_number), found in seen_courses.items() if not found]
+    return list(matched.values()), unmatched
@@ -0,0 +1,349 @@
+from contextlib import contextmanager
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+import backend.models as models, backend.parse as parse, backend.search as search, backend.seats as seats
+from backend.constants.courses import DAYS_OF_WEEK, ClassKeys
+
+logger = logging.getLogger('uvicorn.error')
+
+# The natural key each table is diffed on, rows that share a key are the same row
+NATURAL_KEYS = {
+    "professors": ["id"],
+    "courses": ["subject_code", "catalog_number"],
+    "sections": ["id"],
+    "section_professors": ["section_id", "professor_id"],
+    "meetings": ["section_id", "days_of_week", "time_start", "time_end", "location"],
+}
+
+# Parents first, deletes walk this backwards so we never leave dangling foreign keys
+TABLE_MODELS = {
+    "professors": models.Professor,
+    "courses": models.Course,
+    "sections": models.Section,
+    "section_professors": models.SectionProfessor,
+    "meetings": models.Meeting,
+}
+
+# One step of a refresh, the step fills in rows_in / rows_out when they mean something
+class Stage:
+    __slots__ = ("name", "seconds", "rows_in", "rows_out")
+
+    def __init__(self, name: str, rows_in: int | None = None):
+        self.name = name
+        self.seconds = 0.0
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __str__(self) -> str:
+        rows = ""
+        if self.rows_in is not None or self.rows_out is not None:
+            rows = f" ({'?' if self.rows_in is None else self.rows_in}->{'?' if self.rows_out is None else self.rows_out} rows)"
+        return f"{self.name}={self.seconds:.3f}s{rows}"
+
+# Keeps track of how long each step of a refresh takes and how many rows go through it
+class StageTimer:
+    def __init__(self):
+        self.stages: dict[str, Stage] = {}
+
+    @property
+    def timings(self) -> dict[str, float]:
+        return {name: stage.seconds for name, stage in self.stages.items()}
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None):
+        stage = self.stages[name] = Stage(name, rows_in)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+
+    def report(self) -> str:
+        return ", ".join(str(stage) for stage in self.stages.values())
+
+# Rows with missing meeting times, instructors or roles were nulled out by the parser, drop those
+def clean(data: pd.DataFrame) -> pd.DataFrame:
+    data = data.dropna()
+
+    # Only storrs for now :(
+    data = data[data[ClassKeys.CLASS_CAMPUS_LDESC.value] == "Storrs"].copy()
+
+    # Minutes since midnight -> "HH:MM:SS"
+    for key in (ClassKeys.CLASSM_MEETING_TIME_START, ClassKeys.CLASSM_MEETING_TIME_END):
+        minutes = data[key.value].astype(int)
+        data[key.value] = (
+            (minutes // 60).astype(str).str.zfill(2) + ":" + (minutes % 60).astype(str).str.zfill(2) + ":00"
+        )
+
+    return data
+
+# Split the flat registrar rows into one frame per table, deduped on their natural keys
+def normalize(data: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    professors = (
+        data.drop_duplicates(ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value)
+        .rename(columns={
+            ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value: "id",
+            ClassKeys.Define_CLASSM_INSTRUCTOR_NAME.value: "name",
+        })[["id", "name"]]
+    )
+
+    course_keys = [ClassKeys.CLASS_SUBJECT_CD.value, ClassKeys.CLASS_CATALOG_NBR.value]
+    courses = (
+        data.drop_duplicates(course_keys)
+        .rename(columns={
+            ClassKeys.CLASS_SUBJECT_CD.value: "subject_code",
+            ClassKeys.CLASS_SUBJECT_LDESC.value: "subject_desc",
+            ClassKeys.CLASS_CATALOG_NBR.value: "catalog_number",
+            ClassKeys.CLASS_DESCR.value: "description",
+            ClassKeys.CASSC_UNITS_MINIMUM.value: "min_credits",
+            ClassKeys.CASSC_UNITS_MAXIMUM.value: "max_credits",
+        })[["subject_code", "subject_desc", "catalog_number", "description", "min_credits", "max_credits"]]
+    )
+    # Sections keep their course's natural key until course ids are assigned
+    sections = (
+        data.drop_duplicates(ClassKeys.CLASS_CLASS_NBR.value)
+        .rename(columns={
+            ClassKeys.CLASS_CLASS_NBR.value: "id",
+            ClassKeys.CLASS_SUBJECT_CD.value: "subject_code",
+            ClassKeys.CLASS_CATALOG_NBR.value: "catalog_number",
+            ClassKeys.CLASS_SECTION.value: "section_catalog",
+            ClassKeys.CLASS_INSTRUCTION_MODE_LDESC.value: "instruction_type",
+            ClassKeys.CLASS_ENRL_CAP.value: "enrollment_cap",
+            ClassKeys.CLASS_ENRL_TOT.value: "enrollment_total",
+            ClassKeys.CLASS_WAIT_CAP.value: "waitlist_cap",
+            ClassKeys.CLASS_WAIT_TOT.value: "waitlist_total",
+        })[["id", "subject_code", "catalog_number", "section_catalog", "instruction_type",
+            "enrollment_cap", "enrollment_total", "waitlist_cap", "waitlist_total"]]
+    )
+
+    # TODO Add self referential many to many relationship for sections.
+    # This will allow parent child sections where a parent is a lecture and child could be lab/discussion.
+    # TODO also logic for generating these relationships
+    # For each professor that is a PI of a lecture,
+    #   Their lab/discussion sections are those they are a SI in
+
+    section_professors = (
+        data.drop_duplicates([ClassKeys.CLASS_CLASS_NBR.value, ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value])
+        .rename(columns={
+            ClassKeys.CLASS_CLASS_NBR.value: "section_id",
+            ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value: "professor_id",
+            ClassKeys.CLASSM_INSTRUCTOR_ROLE.value: "role",
+        })[["section_id", "professor_id", "role"]]
+    )
+
+    # Days are stored as the concatenated day keys, ex. "CLASSM_MONDAYCLASSM_WEDNESDAY"
+    days = data[parse.DAYS_COLUMN].astype(int)
+    days_of_week = pd.Series("", index=data.index)
+    for bit, day in enumerate(DAYS_OF_WEEK):
+        days_of_week = days_of_week + np.where(days & (1 << bit), day.value, "")
+    meetings = (
+        data.assign(days_of_week=days_of_week)
+        .rename(columns={
+            ClassKeys.CLASS_CLASS_NBR.value: "section_id",
+            ClassKeys.CLASSM_MEETING_TIME_START.value: "time_start",
+            ClassKeys.CLASSM_MEETING_TIME_END.value: "time_end",
+            ClassKeys.CLASSM_FACILITY_LDESC.value: "location",
+        })[["section_id", "days_of_week", "time_start", "time_end", "location"]]
+        .drop_duplicates()
+    )
+
+    return {
+        "professors": professors,
+        "courses": courses,
+        "sections": sections,
+        "section_professors": section_professors,
+        "meetings": meetings,
+    }
+
+# Cast each column to the type its model column stores so old and new rows compare equal
+def coerce(frame: pd.DataFrame, model) -> pd.DataFrame:
+    frame = frame.copy()
+    columns = model.__table__.columns
+    for name in frame.columns:
+        if name not in columns:
+            continue
+        python_type = columns[name].type.python_type
+        if python_type is int:
+            frame[name] = pd.to_numeric(frame[name]).astype("Int64")
+        elif python_type is float:
+            # parse reads units as float32, 3.3 would come back as 3.2999999523
+            frame[name] = pd.to_numeric(frame[name]).astype("Float64").round(2)
+        elif python_type is str:
+            frame[name] = frame[name].map(str, na_action="ignore")
+    return frame
+
+# numpy scalars can't be bound by sqlite3, to_dict hands back plain python values
+def to_records(frame: pd.DataFrame) -> list[dict]:
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+# What has to change to turn one table snapshot into the other.
+# update_columns[i] holds the columns that differ in updates[i].
+class TableDiff:
+    def __init__(self, inserts: list[dict], updates: list[dict], deletes: list[int],
+                 update_columns: list[set[str]] | None = None):
+        self.inserts = inserts
+        self.updates = updates
+        self.deletes = deletes
+        self.update_columns = update_columns if update_columns is not None else [set() for _ in updates]
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    # Every column that differs in at least one update
+    @property
+    def changed(self) -> set[str]:
+        return set().union(*self.update_columns)
+
+    def updated(self, columns: set[str]) -> list[dict]:
+        return [row for row, changed in zip(self.updates, self.update_columns) if changed & columns]
+
+def diff(old: pd.DataFrame, new: pd.DataFrame, keys: list[str]) -> TableDiff:
+    old_rows = {tuple(row[key] for key in keys): row for row in to_records(old)}
+    new_rows = {tuple(row[key] for key in keys): row for row in to_records(new)}
+
+    inserts = [row for key, row in new_rows.items() if key not in old_rows]
+    deletes = [row["id"] for key, row in old_rows.items() if key not in new_rows]
+    updates, update_columns = [], []
+    for key, row in new_rows.items():
+        previous = old_rows.get(key)
+        if previous is None:
+            continue
+        columns = {column for column, value in row.items() if column != "id" and previous[column] != value}
+        if columns:
+            updates.append({**row, "id": previous["id"]})
+            update_columns.append(columns)
+
+    return TableDiff(inserts, updates, deletes, update_columns)
+
+# What course_search is built from, None meaning any column. Seat counts, credits and
+# meetings aren't searchable, so refreshes that only move those leave the index alone.
+SEARCH_INPUTS = {
+    "professors": {"name"},
+    "courses": {"subject_code", "catalog_number", "subject_desc", "description"},
+    "sections": {"course_id"},
+    "section_professors": None,
+}
+
+def changes_search(diffs: dict[str, TableDiff]) -> bool:
+    for name, columns in SEARCH_INPUTS.items():
+        changes = diffs[name]
+        if changes.inserts or changes.deletes:
+            return True
+        if changes.updates and (columns is None or changes.changed & columns):
+            return True
+    return False
+
+# Read back what is currently stored, in the same shape normalize() produces
+def read_snapshot(db: Session) -> dict[str, pd.DataFrame]:
+    connection = db.connection()
+    return {
+        name: coerce(pd.read_sql(select(model), connection), model)
+        for name, model in TABLE_MODELS.items()
+    }
+
+def is_empty(db: Session) -> bool:
+    return db.execute(select(models.Course.id).limit(1)).first() is None
+
+# Reuse the ids of courses we already know about and number the new ones after them
+def assign_course_ids(tables: dict[str, pd.DataFrame], previous: pd.DataFrame):
+    course_keys = NATURAL_KEYS["courses"]
+    courses = tables["courses"].merge(previous[["id", *course_keys]], on=course_keys, how="left")
+    missing = courses["id"].isna()
+    next_id = int(previous["id"].max()) + 1 if len(previous) else 1
+    courses.loc[missing, "id"] = np.arange(next_id, next_id + missing.sum())
+    courses["id"] = courses["id"].astype("Int64")
+
+    sections = tables["sections"].merge(
+        courses[["id", *course_keys]].rename(columns={"id": "course_id"}), on=course_keys
+    ).drop(columns=course_keys)
+
+    tables["courses"] = courses
+    tables["sections"] = sections
+
+def compute_diffs(db: Session, tables: dict[str, pd.DataFrame]) -> dict[str, TableDiff]:
+    previous = read_snapshot(db)
+    assign_course_ids(tables, previous["courses"])
+    return {
+        name: diff(previous[name], coerce(tables[name], TABLE_MODELS[name]), NATURAL_KEYS[name])
+        for name in TABLE_MODELS
+    }
+
+# Apply only what changed, the caller owns the transaction
+def write(db: Session, diffs: dict[str, TableDiff], chunk_size: int = 500):
+    for name, model in TABLE_MODELS.items():
+        changes = diffs[name]
+        if changes.inserts:
+            db.execute(insert(model), changes.inserts)
+        if changes.updates:
+            # ORM bulk update by primary key, one executemany
+            db.execute(update(model), changes.updates)
+
+    for name, model in reversed(TABLE_MODELS.items()):
+        deletes = diffs[name].deletes
+        for i in range(0, len(deletes), chunk_size):
+            db.execute(delete(model).where(model.id.in_(deletes[i:i + chunk_size])))
+
+# Append a seat_counts row for every section whose counts just changed. Every refresh records
+# its changes, so the sections diff already says which those are: new sections, and updates
+# touching a seat column. Only an empty history (a new db, or one from before seat_counts)
+# gets a row for every section.
+def record_seats(db: Session, sections: TableDiff, current: pd.DataFrame, recorded_at: int | None = None) -> int:
+    recorded_at = recorded_at or int(time.time())
+    if db.execute(select(models.SeatCount.id).limit(1)).first() is None:
+        changed = to_records(coerce(current[["id", *seats.SEAT_COLUMNS]], models.Section))
+    else:
+        changed = sections.inserts + sections.updated(set(seats.SEAT_COLUMNS))
+
+    rows = [
+        {"section_id": row["id"], **{column: row[column] for column in seats.SEAT_COLUMNS}, "recorded_at": recorded_at}
+        for row in changed
+    ]
+    if rows:
+        db.execute(insert(models.SeatCount), rows)
+    return len(rows)
+
+# Clean, normalize and store a parsed registrar table
+def load_courses(db: Session, data: pd.DataFrame, timer: StageTimer | None = None) -> StageTimer:
+    timer = timer or StageTimer()
+
+    with timer.stage("clean", rows_in=len(data)) as stage:
+        data = clean(data)
+        stage.rows_out = len(data)
+    with timer.stage("normalize", rows_in=len(data)) as stage:
+        tables = normalize(data)
+        stage.rows_out = sum(len(table) for table in tables.values())
+    try:
+        with timer.stage("diff", rows_in=stage.rows_out) as stage:
+            diffs = compute_diffs(db, tables)
+            # Don't hold the read snapshot open while we wait for the writer lock
+            db.rollback()
+            stage.rows_out = sum(len(changes) for changes in diffs.values())
+        with timer.stage("write", rows_in=stage.rows_out) as stage:
+            write(db, diffs)
+            stage.rows_out = stage.rows_in
+        with timer.stage("seats", rows_in=len(diffs["sections"])) as stage:
+            seat_changes = stage.rows_out = record_seats(db, diffs["sections"], tables["sections"])
+        # Same transaction, so search never disagrees with /classes
+        if changes_search(diffs):
+            with timer.stage("index", rows_in=len(tables["courses"])):
+                search.rebuild_index(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.debug(
+        "Catalog changes: %s, seat counts +%d",
+        ", ".join(
+            f"{name} +{len(changes.inserts)} ~{len(changes.updates)} -{len(changes.deletes)}"
+            for name, changes in diffs.items()
+        ),
+        seat_changes,
+    )
+    return timer
@@ -1,49 +1,44 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
 from contextlib import asynccontextmanager
+from datetime import date
+from typing import Literal
 import logging
-import requests
 import uvicorn
-import io 
-import json
-import pandas as pd
-from backend.constants.courses import ClassKeys
-import numpy as np
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
-import backend.crud as crud, backend.models as models
-from backend.database import SessionLocal, engine
-from backend.schemas import CourseSchema
-import os
+import backend.cache as cache, backend.generator as generator, backend.ics as ics, backend.importer as importer, backend.metrics as metrics, backend.migrations as migrations, backend.search as search, backend.seats as seats, backend.snapshot as snapshot
+from backend.database import AsyncSessionLocal, async_engine, engine
+from backend.schemas import DAY_NAMES, CourseBatchSchema, CourseSchema, ImportSchema, ScheduleRequestSchema, ScheduleSchema, SearchResultSchema, SeatTrendSchema, SeatsSchema
 
-# We don't want this feature
-pd.set_option('future.no_silent_downcasting', True)
-
-# Bind our engine
-models.Base.metadata.create_all(bind=engine)
-
-# We want an independent db connection for each request 
-def get_db():
-    db = SessionLocal()
-    try:
+# We want an independent db session for each request, connections come from the async pool
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Count and time every query the api runs, the sync engine builds the catalog snapshot
+metrics.instrument(async_engine.sync_engine)
+metrics.instrument(engine)
 
 # Configure logging
 logger = logging.getLogger('uvicorn.error')
 logger.setLevel(logging.DEBUG)
 
-# Ensures the scheduled job starts on start! and shuts down on exit
+# Courses are refreshed by backend/worker.py in its own process, the api only serves what's stored
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    logger.debug("start scheduler")
-    scheduler.start()
+    # Bind our engine, creating or upgrading the schema. Done here rather than at import so the
+    # pdf importer's worker processes, which re-import this module, don't touch the db.
+    migrations.migrate(engine)
+    logger.debug("serving the stored catalog, run `python -m backend.worker` to refresh it")
+    await catalog_store.get()
     yield
-    scheduler.shutdown()
+    importer.shutdown()
+    await async_engine.dispose()
 
 # App setup
 app = FastAPI(lifespan = lifespan)
@@ -60,184 +55,189 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # So the frontend can tell a truncated /schedules search apart
+    expose_headers=["X-Schedules-Complete"],
 )
-
-# The cron job for fetching courses
-def fetch_courses():
-    logger.debug("Fetching courses...")
-    
-    url = "https://files.registrar.uconn.edu/registrar_public/All_Classes_Table_Format_Fall.xlsx"
-    try:
-        response = requests.get(url, stream=True)
-        
-        if response.status_code == 200:
-            data = pd.read_excel(io.BytesIO(response.content), engine="openpyxl", usecols=[key.value for key in ClassKeys])
-            
-            # Clean Data. Some empty fields are "." for some reason
-            data.replace({ClassKeys.CLASSM_MEETING_TIME_START.value: '.'}, np.nan, inplace=True)
-            data.replace({ClassKeys.CLASSM_MEETING_TIME_END.value: '.'}, np.nan, inplace=True)
-            data.replace({ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value: ' '}, np.nan, inplace=True)
-            data.replace({ClassKeys.CLASSM_INSTRUCTOR_ROLE.value: '.'}, np.nan, inplace=True)
-            data.dropna(inplace=True)
-            
-            # Only storrs for now :(
-            data = data[data[ClassKeys.CLASS_CAMPUS_LDESC.value] == "Storrs"]
-            
-            days_of_week = [
-                ClassKeys.CLASSM_MONDAY,
-                ClassKeys.CLASSM_TUESDAY,
-                ClassKeys.CLASSM_WEDNESDAY,
-                ClassKeys.CLASSM_THURSDAY,
-                ClassKeys.CLASSM_FRIDAY,
-                ClassKeys.CLASSM_SATURDAY,
-                ClassKeys.CLASSM_SUNDAY,
-            ]
-            
-            # Y/N -> True/False
-            for day in days_of_week:
-                data.replace({day.value: 'Y'}, True, inplace=True)
-                data.replace({day.value: 'N'}, False, inplace=True)
-  
-            data[ClassKeys.CLASSM_MEETING_TIME_START.value] = pd.to_datetime(
-                data[ClassKeys.CLASSM_MEETING_TIME_START.value], format='%I:%M:%S %p'
-            ).dt.time
-            data[ClassKeys.CLASSM_MEETING_TIME_END.value] = pd.to_datetime(
-                data[ClassKeys.CLASSM_MEETING_TIME_END.value], format='%I:%M:%S %p'
-            ).dt.time
-            
-            # Normalize and insert data
-            db = SessionLocal()
-            try:
-                # Clear existing data
-                db.query(models.SectionProfessor).delete()
-                db.query(models.Professor).delete()
-                db.query(models.Section).delete()
-                db.query(models.Course).delete()
-                db.commit()
-
-                # Insert data into db
-                for _, row in data.iterrows():
-                    # Reuse or create professor
-                    professor = db.query(models.Professor).filter_by(
-                        id=row[ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value]
-                    ).first()
-                    if not professor:
-                        professor = models.Professor(
-                            id=row[ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID.value],
-                            name=row[ClassKeys.Define_CLASSM_INSTRUCTOR_NAME.value],
-                        )
-                        db.add(professor)
-                        db.flush() # note: flush is needed if we need primary keys
-
-                    # Reuse or create course
-                    course = db.query(models.Course).filter_by(
-                        subject_code=row[ClassKeys.CLASS_SUBJECT_CD.value],
-                        catalog_number=row[ClassKeys.CLASS_CATALOG_NBR.value],
-                    ).first()
-                    if not course:
-                        course = models.Course(
-                            subject_code=row[ClassKeys.CLASS_SUBJECT_CD.value],
-                            subject_desc=row[ClassKeys.CLASS_SUBJECT_LDESC.value],
-                            catalog_number=row[ClassKeys.CLASS_CATALOG_NBR.value],
-                            description=row[ClassKeys.CLASS_DESCR.value],
-                            min_credits=row[ClassKeys.CASSC_UNITS_MINIMUM.value],
-                            max_credits=row[ClassKeys.CASSC_UNITS_MAXIMUM.value],
-                        )
-                        db.add(course)
-                        db.flush()
-
-                    # Reuse or create section
-                    section = db.query(models.Section).filter_by(
-                        id = row[ClassKeys.CLASS_CLASS_NBR.value]
-                    ).first()
-                    if not section:
-                        section = models.Section(
-                            id = row[ClassKeys.CLASS_CLASS_NBR.value],
-                            course_id=course.id,
-                            section_catalog=row[ClassKeys.CLASS_SECTION.value],
-                            instruction_type=row[ClassKeys.CLASS_INSTRUCTION_MODE_LDESC.value],
-                            enrollment_cap=row[ClassKeys.CLASS_ENRL_CAP.value],
-                            enrollment_total=row[ClassKeys.CLASS_ENRL_TOT.value],
-                            waitlist_cap=row[ClassKeys.CLASS_WAIT_CAP.value],
-                            waitlist_total=row[ClassKeys.CLASS_WAIT_TOT.value],
-                        )
-                        db.add(section)
-                        db.flush()
-
-                    # Link professor to section
-                    section_professor = db.query(models.SectionProfessor).filter_by(
-                        section_id=section.id,
-                        professor_id=professor.id
-                    ).first()
-
-                    if not section_professor:
-                        section_professor = models.SectionProfessor(
-                            section_id=section.id,
-                            professor_id=professor.id,
-                            role=row[ClassKeys.CLASSM_INSTRUCTOR_ROLE.value]
-                        )
-                        
-                        db.add(section_professor)
-                    
-                    # Create a meeting time
-                    meeting = db.query(models.Meeting).filter_by(
-                        section_id=section.id,
-                        days_of_week="".join([day.value for day in days_of_week if row[day.value]]),
-                        time_start=str(row[ClassKeys.CLASSM_MEETING_TIME_START.value]),
-                        time_end=str(row[ClassKeys.CLASSM_MEETING_TIME_END.value]),
-                        location=row[ClassKeys.CLASSM_FACILITY_LDESC.value],
-                    ).first()
-                    if not meeting:
-                        meeting = models.Meeting(
-                            section_id=section.id,
-                            days_of_week="".join([day.value for day in days_of_week if row[day.value]]),
-                            time_start=str(row[ClassKeys.CLASSM_MEETING_TIME_START.value]),
-                            time_end=str(row[ClassKeys.CLASSM_MEETING_TIME_END.value]),
-                            location=row[ClassKeys.CLASSM_FACILITY_LDESC.value],
-                        )
-                        db.add(meeting)
-                        
-                    # TODO Add self referential many to many relationship for sections.
-                    # This will allow parent child sections where a parent is a lecture and child could be lab/discussion.
-                    # TODO also logic for generating these relationships
-                    # For each professor that is a PI of a lecture,
-                    #   Their lab/discussion sections are those they are a SI in
-
-                db.commit()
-            except Exception as db_error:
-                db.rollback()
-                logger.exception(db_error)
-            finally:
-                db.close()
-            
-    except Exception as e:
-        logger.exception(e)
-
-# Configure scheduler 
-scheduler = BackgroundScheduler()
-
-fetch_courses()
-trigger = CronTrigger(second='0')
-scheduler.add_job(fetch_courses, trigger)
+# Outermost, so latency covers everything including CORS
+app.add_middleware(metrics.MetricsMiddleware)
 
 @app.get("/")
 async def root():
     return { "message" : "Husky Plan!" }
 
+# Prometheus scrape target, the api's own metrics plus the worker's latest refresh
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render_all(), media_type="text/plain; version=0.0.4")
+
+# Lookups are served from an in-memory snapshot of the catalog, rebuilt when the worker refreshes it
+catalog_store = snapshot.CatalogStore()
+
+# Serialize once per snapshot, every later lookup is served from the cache
+async def load_course(subject: str, catalog_number: str) -> bytes | None:
+    course = (await catalog_store.get()).course(subject, catalog_number)
+    if course is None:
+        return None
+    return snapshot.dumps(course.as_dict())
+
+course_cache = cache.ResponseCache(load_course, version=catalog_store)
+
 @app.get("/classes", response_model=CourseSchema)
-async def classes(subject: str, catalog_number: str, db: Session = Depends(get_db)):
+async def classes(subject: str, catalog_number: str, request: Request):
     logger.debug(f"Subject: {subject}, Catalog Number: {catalog_number}")
-    classes = crud.get_course_by_subject_and_catalog_number(db, subject, catalog_number)
+    await catalog_store.get()
+    classes = await course_cache.lookup(subject, catalog_number)
     
     if classes is None:
         raise HTTPException(status_code=404, detail="Class not found")
-    return classes
-
-# Generate openapi schema
-openapi_schema = app.openapi()
-openapi_path = os.path.join(os.path.dirname(__file__), "constants", "openapi.json")
-with open(openapi_path, "w") as f:
-    json.dump(openapi_schema, f, indent=2)
+    if request.headers.get("if-none-match") == classes.etag:
+        return Response(status_code=304, headers={"ETag": classes.etag})
+    return Response(classes.body, media_type="application/json", headers={"ETag": classes.etag})
+
+# Typeahead over course codes, titles, descriptions and instructors, ex. "intro to da"
+@app.get("/search", response_model=list[SearchResultSchema])
+async def search_courses(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_db),
+):
+    return await search.search_courses(db, q, limit, offset)
+
+# Live seat counts for many sections at once, cheap enough to poll. The ETag only changes
+# when one of the counts does.
+seats_adapter = TypeAdapter(list[SeatsSchema])
+
+@app.get("/seats", response_model=list[SeatsSchema])
+async def seat_counts(
+    request: Request,
+    sections: list[int] = Query(min_length=1, max_length=500),
+    db: AsyncSession = Depends(get_db),
+):
+    rows = seats_adapter.validate_python(await seats.current(db, sections))
+    counts = cache.CachedResponse(seats_adapter.dump_json(rows))
+    if request.headers.get("if-none-match") == counts.etag:
+        return Response(status_code=304, headers={"ETag": counts.etag})
+    return Response(counts.body, media_type="application/json", headers={"ETag": counts.etag})
+
+# How full a section has been over time, one point per hour or day
+@app.get("/seats/{section_id}/trend", response_model=list[SeatTrendSchema])
+async def seat_trend(
+    section_id: int,
+    days: int = Query(default=14, ge=1, le=180),
+    interval: Literal["hour", "day"] = "day",
+    db: AsyncSession = Depends(get_db),
+):
+    points = await seats.trend(db, section_id, days, seats.INTERVALS[interval])
+    if not points:
+        raise HTTPException(status_code=404, detail="No seat history for this section")
+    return points
+
+# Load a whole schedule in one request, keyed by "SUBJECT CATALOG_NUMBER"
+@app.post("/classes/batch", response_model=dict[str, CourseSchema])
+async def classes_batch(batch: CourseBatchSchema):
+    logger.debug(f"Batch: {len(batch.courses)} courses, {len(batch.sections)} sections")
+    keys = [(course.subject, course.catalog_number) for course in batch.courses]
+    courses = (await catalog_store.get()).lookup(keys, batch.sections)
+    return Response(snapshot.dumps({course.key: course.as_dict() for course in courses}), media_type="application/json")
+
+# Auto-generate schedules, best first as one json object per line. The search has a time budget,
+# when it runs out the schedules are the best found so far and X-Schedules-Complete is false.
+@app.post("/schedules", response_class=Response, responses={200: {
+    "model": ScheduleSchema,
+    "content": {"application/x-ndjson": {}},
+    "headers": {"X-Schedules-Complete": {"description": "false if the search ran out of time", "schema": {"type": "string"}}},
+}})
+async def schedules(request: ScheduleRequestSchema):
+    keys = [(course.subject, course.catalog_number) for course in request.courses]
+    courses = (await catalog_store.get()).courses
+    missing = [f"{subject} {catalog_number}" for subject, catalog_number in keys if (subject, catalog_number) not in courses]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Class not found: {', '.join(missing)}")
+
+    constraints = generator.Constraints(
+        earliest_start=snapshot.to_minutes(request.earliest_start) if request.earliest_start else None,
+        blocked_days={DAY_NAMES.index(day) for day in request.blocked_days},
+        min_gap=request.min_gap,
+        open_seats_only=request.open_seats_only,
+    )
+    options = [generator.build_options(courses[key], constraints) for key in dict.fromkeys(keys)]
+    # Up to the whole time budget of pure python, keep it off the event loop
+    results, complete = await run_in_threadpool(generator.generate, options, limit=request.limit)
+
+    lines = [
+        ScheduleSchema(
+            rank=rank,
+            minutes_on_campus=schedule.minutes,
+            sections=[
+                {"course": course, "section_ids": option.section_ids}
+                for course, option in schedule.choices
+            ],
+        ).model_dump_json() + "\n"
+        for rank, schedule in enumerate(results, start=1)
+    ]
+    return Response(
+        "".join(lines),
+        media_type="application/x-ndjson",
+        headers={"X-Schedules-Complete": "true" if complete else "false"},
+    )
+
+# A section's events only depend on the catalog and the term, so they're built once and shared by
+# every student exporting it
+async def load_section_events(section_id: int, term_start: date, term_end: date) -> bytes | None:
+    section = (await catalog_store.get()).sections.get(section_id)
+    if section is None:
+        return None
+    return ics.section_events(section, term_start, term_end)
+
+event_cache = cache.ResponseCache(load_section_events, maxsize=8192, version=catalog_store)
+
+# Export sections (CLASS_CLASS_NBR) as an .ics file to import into any calendar app
+@app.get("/calendar.ics", response_class=StreamingResponse, responses={200: {"content": {"text/calendar": {}}}})
+async def calendar(
+    term_start: date,
+    term_end: date,
+    sections: list[int] = Query(min_length=1, max_length=100),
+):
+    if term_end < term_start or (term_end - term_start).days > 366:
+        raise HTTPException(status_code=400, detail="term_end must be within a year after term_start")
+    catalog = await catalog_store.get()
+    missing = [str(section_id) for section_id in sections if section_id not in catalog.sections]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Section not found: {', '.join(missing)}")
+
+    async def fragments():
+        for section_id in dict.fromkeys(sections):
+            events = await event_cache.lookup(section_id, term_start, term_end)
+            yield None if events is None else events.body
+
+    return StreamingResponse(
+        ics.stream_calendar(fragments()),
+        media_type="text/calendar",
+        headers={"Content-Disposition": 'attachment; filename="husky_plan.ics"'},
+    )
+
+
+# Upload a registration pdf, get back the sections in it ready for /calendar.ics
+@app.post("/import", response_model=ImportSchema)
+async def import_schedule(file: UploadFile):
+    data = await file.read(importer.MAX_UPLOAD_BYTES + 1)
+    try:
+        lines = await importer.extract(data)
+    except importer.PdfTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (importer.ImportTimeout, importer.ReaderCrashed) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except importer.UnreadablePdf:
+        raise HTTPException(status_code=422, detail="Could not read the pdf")
+
+    sections, unmatched = importer.match(await catalog_store.get(), lines)
+    logger.debug(f"Import: {len(lines)} lines, {len(sections)} sections matched, {len(unmatched)} unmatched")
+    courses = {section.course.key: section.course.as_dict() for section in sections}
+    return Response(
+        snapshot.dumps({"sections": [section.id for section in sections], "courses": courses, "unmatched": unmatched}),
+        media_type="application/json",
+    )
     
 if __name__ == '__main__':
     uvicorn.run(app, host="0.0.0.0", port = 8000)
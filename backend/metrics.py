@@ -0,0 +1,248 @@
+import bisect
+import cProfile
+from contextvars import ContextVar
+import io
+import os
+import pstats
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import Engine, event
+
+from backend.paths import data_path
+
+# Counters, gauges and histograms rendered in the Prometheus text format, see /metrics.
+# Each process keeps its own registry. The worker writes its registry to METRICS_PATH after
+# every refresh and the api appends that file to its own, so one scrape sees both.
+# With several api processes each one only reports its own requests.
+
+METRICS_PATH = os.environ.get("HUSKY_METRICS_PATH", data_path("husky_plan.metrics"))
+# HUSKY_PROFILING=1 lets any request add ?profile=1 to get a cProfile report instead of its response
+PROFILING = os.environ.get("HUSKY_PROFILING") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Integers as integers, floats round-trip (":g" would turn a timestamp into 1.79e+09)
+def format_value(value) -> str:
+    return str(value)
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, help: str, labels: tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, object] = {}
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(labels[name] for name in self.labels)
+
+    def render(self, namespace: str) -> list[str]:
+        name = f"{namespace}_{self.name}"
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.extend(self.render_value(name, key, value))
+        return lines
+
+    def render_value(self, name: str, key: tuple, value) -> list[str]:
+        return [f"{name}{format_labels(self.labels, key)} {format_value(value)}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self.registry.lock:
+            self.values[self.key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = buckets
+
+    # Per label set: [count per bucket (+Inf last), sum]
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            counts, total = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[key] = (counts, total + value)
+
+    def render_value(self, name: str, key: tuple, value) -> list[str]:
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound:g}"'
+            lines.append(f"{name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.metrics: list[Metric] = []
+        self.lock = threading.Lock()
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        return self.add(Counter(self, name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Gauge:
+        return self.add(Gauge(self, name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.add(Histogram(self, name, help, labels, buckets))
+
+    def render(self) -> str:
+        with self.lock:
+            lines = [line for metric in self.metrics if metric.values for line in metric.render(self.namespace)]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    # Written to a temp file and swapped in so the api never reads half a file
+    def write(self, path: str = METRICS_PATH):
+        with open(path + ".tmp", "w") as f:
+            f.write(self.render())
+        os.replace(path + ".tmp", path)
+
+# The api's registry, the worker renames it to husky_worker so the two never share a metric name
+registry = Registry("husky_api")
+
+sql_statements = registry.counter("sql_statements_total", "SQL statements executed", ("operation",))
+sql_seconds = registry.histogram("sql_statement_seconds", "SQL statement duration", ("operation",))
+http_seconds = registry.histogram("http_request_seconds", "Request latency by route", ("method", "route", "status"))
+http_sql_statements = registry.counter("http_sql_statements_total", "SQL statements run while serving each route", ("method", "route"))
+refresh_stage_seconds = registry.histogram("refresh_stage_seconds", "Duration of each refresh stage", ("stage",), STAGE_BUCKETS)
+refresh_stage_rows = registry.gauge("refresh_stage_rows", "Rows in and out of each stage of the last refresh", ("stage", "direction"))
+refreshes = registry.counter("refreshes_total", "Catalog refreshes by outcome", ("result",))
+last_refresh = registry.gauge("last_refresh_timestamp_seconds", "When a refresh last finished, by outcome", ("result",))
+catalog_records = registry.gauge("catalog_snapshot_records", "Records in the catalog snapshot being served", ("record",))
+catalog_bytes = registry.gauge("catalog_snapshot_bytes", "Memory held by the catalog snapshot being served", ("record",))
+catalog_version = registry.gauge("catalog_snapshot_version", "Catalog version being served")
+
+# SQL run while a request is being served is also counted against its route
+class RequestStats:
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements = 0
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return word if word in ("select", "insert", "update", "delete") else "other"
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    kind = operation(statement)
+    sql_statements.inc(operation=kind)
+    sql_seconds.observe(seconds, operation=kind)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+
+def handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def instrument(engine: Engine):
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+# Pure ASGI so the request's stats live in the same context as the handler that runs the queries
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if PROFILING and b"profile=1" in scope.get("query_string", b""):
+            return await self.profile(scope, receive, send)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            # The route template, not the path, so ids don't explode the label set
+            route = scope.get("route")
+            route = getattr(route, "path", "unmatched")
+            http_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
+            if stats.statements:
+                http_sql_statements.inc(stats.statements, method=scope["method"], route=route)
+
+    # Everything on the event loop is profiled while the request runs, so profile on a quiet instance
+    async def profile(self, scope, receive, send):
+        async def discard(message):
+            pass
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            profiler.disable()
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(40)
+        body = report.getvalue().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+# What /metrics serves: this process's registry plus whatever the worker last wrote
+def render_all(path: str = METRICS_PATH) -> str:
+    text = registry.render()
+    try:
+        with open(path) as f:
+            text += f.read()
+    except FileNotFoundError:
+        pass
+    return text
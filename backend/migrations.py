@@ -0,0 +1,67 @@
+import argparse
+import fcntl
+import os
+import sys
+
+from sqlalchemy import Engine, select, text
+
+import backend.search as search, backend.seats as seats
+from backend.database import Base, engine as default_engine
+from backend.models import Course, Meeting, SeatCount, Section, SectionProfessor
+from backend.paths import data_path
+
+# The api and the worker both migrate on startup, often at the same moment (ex. docker)
+MIGRATE_LOCK_PATH = os.environ.get("HUSKY_MIGRATE_LOCK_PATH", data_path("husky_plan.migrate.lock"))
+
+# create_all only creates missing tables, so indexes added to a model later never reach an
+# existing db. Creating every declared index with checkfirst brings old dbs up to date.
+def migrate(engine: Engine = default_engine, lock_path: str = MIGRATE_LOCK_PATH):
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        Base.metadata.create_all(bind=engine)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+        search.create_index(engine)
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+
+# The queries the snapshot, /seats and the refresh run all the time
+def hot_queries() -> dict:
+    return {
+        "course by subject and catalog number": select(Course).where(
+            (Course.subject_code == "CSE") & (Course.catalog_number == "1010")
+        ),
+        "sections by course": select(Section).where(Section.course_id.in_([1, 2])),
+        "meetings by section": select(Meeting).where(Meeting.section_id.in_([1, 2])),
+        "professors by section": select(SectionProfessor).where(SectionProfessor.section_id.in_([1, 2])),
+        "latest seats by section": select(SeatCount)
+            .join(Section, Section.id == SeatCount.section_id)
+            .where(SeatCount.id.in_(seats.latest_ids([1, 2]))),
+        "seat history for a section": select(SeatCount).where(
+            (SeatCount.section_id == 1) & (SeatCount.recorded_at > 0)
+        ),
+    }
+
+# Any hot query sqlite answers with a plain "SCAN <table>" is reading the whole table
+def full_scans(engine: Engine = default_engine) -> dict[str, list[str]]:
+    scans = {}
+    with engine.connect() as connection:
+        for name, query in hot_queries().items():
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+            scans[name] = [step for step in plan if step.startswith("SCAN") and "USING" not in step]
+    return scans
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bring the db schema up to date")
+    parser.add_argument("--check", action="store_true", help="fail if a hot query scans a whole table")
+    args = parser.parse_args()
+
+    migrate()
+    if args.check:
+        failed = False
+        for name, scans in full_scans().items():
+            print(f"{'FAIL' if scans else 'ok  '} {name}{': ' + ', '.join(scans) if scans else ''}")
+            failed = failed or bool(scans)
+        sys.exit(1 if failed else 0)
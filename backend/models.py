@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List, Optional
 
@@ -7,14 +7,19 @@ from backend.database import Base
 
 class Course(Base):
     __tablename__ = "courses"
+    # Unique index rather than a constraint so migrations can add it to an existing sqlite table
+    __table_args__ = (
+        Index("ix_courses_subject_code_catalog_number", "subject_code", "catalog_number", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, unique=True)
     subject_code: Mapped[str] = mapped_column()
     subject_desc: Mapped[Optional[str]] = mapped_column()
     catalog_number: Mapped[str] = mapped_column()
     description: Mapped[Optional[str]] = mapped_column()
-    min_credits: Mapped[int] = mapped_column()
-    max_credits: Mapped[int] = mapped_column()
+    # Some classes carry fractional units, ex. 1.5
+    min_credits: Mapped[float] = mapped_column()
+    max_credits: Mapped[float] = mapped_column()
     
     sections: Mapped[List["Section"]] = relationship(back_populates="course")
 
@@ -23,7 +28,7 @@ class Section(Base):
     __tablename__ = "sections"
     
     id: Mapped[int] = mapped_column(primary_key=True)
-    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"))
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), index=True)
     section_catalog: Mapped[str] = mapped_column()
     instruction_type: Mapped[Optional[str]] = mapped_column()
     enrollment_cap: Mapped[Optional[int]] = mapped_column()
@@ -40,7 +45,7 @@ class Meeting(Base):
     __tablename__ = "meetings"
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"))
+    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"), index=True)
     days_of_week: Mapped[str] = mapped_column()
     time_start: Mapped[Optional[str]] = mapped_column()
     time_end: Mapped[Optional[str]] = mapped_column()
@@ -58,6 +63,9 @@ class Professor(Base):
 
 class SectionProfessor(Base):
     __tablename__ = "section_professors"
+    __table_args__ = (
+        Index("ix_section_professors_section_id_professor_id", "section_id", "professor_id", unique=True),
+    )
     
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     professor_id: Mapped[int] = mapped_column(ForeignKey("professors.id"))
@@ -66,3 +74,21 @@ class SectionProfessor(Base):
     
     section: Mapped["Section"] = relationship(back_populates="professors")
     professor: Mapped["Professor"] = relationship()
+
+
+# Enrollment history, see seats.py. A row is only appended when a section's counts change.
+# No foreign key, the history outlives sections that drop out of the catalog.
+class SeatCount(Base):
+    __tablename__ = "seat_counts"
+    __table_args__ = (
+        Index("ix_seat_counts_section_id_recorded_at", "section_id", "recorded_at"),
+    )
+    
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    section_id: Mapped[int] = mapped_column()
+    # Unix seconds
+    recorded_at: Mapped[int] = mapped_column()
+    enrollment_cap: Mapped[Optional[int]] = mapped_column()
+    enrollment_total: Mapped[Optional[int]] = mapped_column()
+    waitlist_cap: Mapped[Optional[int]] = mapped_column()
+    waitlist_total: Mapped[Optional[int]] = mapped_column()
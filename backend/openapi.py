@@ -0,0 +1,11 @@
+import json
+import os
+
+from backend.main import app
+
+# Generate openapi schema, run with `python -m backend.openapi` after changing the api
+if __name__ == '__main__':
+    openapi_schema = app.openapi()
+    openapi_path = os.path.join(os.path.dirname(__file__), "constants", "openapi.json")
+    with open(openapi_path, "w") as f:
+        json.dump(openapi_schema, f, indent=2)
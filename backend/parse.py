@@ -0,0 +1,142 @@
+import datetime
+import functools
+import os
+
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+
+from backend.constants.courses import DAYS_OF_WEEK, ClassKeys
+
+# The seven Y/N day columns are folded into this one bitmask, see DAYS_OF_WEEK
+DAYS_COLUMN = "CLASSM_DAYS"
+
+INT_COLUMNS = {
+    ClassKeys.CLASS_CLASS_NBR,
+    ClassKeys.CLASS_ENRL_CAP,
+    ClassKeys.CLASS_ENRL_TOT,
+    ClassKeys.CLASS_WAIT_CAP,
+    ClassKeys.CLASS_WAIT_TOT,
+}
+FLOAT_COLUMNS = {
+    ClassKeys.CASSC_UNITS_MINIMUM,
+    ClassKeys.CASSC_UNITS_MAXIMUM,
+}
+# Stored as minutes since midnight
+TIME_COLUMNS = {
+    ClassKeys.CLASSM_MEETING_TIME_START,
+    ClassKeys.CLASSM_MEETING_TIME_END,
+}
+# Some empty fields are "." or " " for some reason
+NULL_MARKERS = {
+    ClassKeys.CLASSM_MEETING_TIME_START: '.',
+    ClassKeys.CLASSM_MEETING_TIME_END: '.',
+    ClassKeys.Define_CLASSM_INSTRUCTOR_EMPLID: ' ',
+    ClassKeys.CLASSM_INSTRUCTOR_ROLE: '.',
+}
+
+def column_type(key: ClassKeys) -> pa.DataType:
+    if key in INT_COLUMNS:
+        return pa.int32()
+    if key in FLOAT_COLUMNS:
+        return pa.float32()
+    if key in TIME_COLUMNS:
+        return pa.int16()
+    return pa.string()
+
+SCHEMA = pa.schema(
+    [pa.field(key.value, column_type(key)) for key in ClassKeys if key not in DAYS_OF_WEEK]
+    + [pa.field(DAYS_COLUMN, pa.uint8())]
+)
+
+# Only a few dozen distinct meeting times exist, so parse each one once
+@functools.lru_cache(maxsize=None)
+def parse_time(value) -> int | None:
+    if isinstance(value, datetime.datetime):
+        value = value.time()
+    if isinstance(value, str):
+        value = datetime.datetime.strptime(value.strip(), '%I:%M:%S %p').time()
+    return value.hour * 60 + value.minute
+
+def to_int(value) -> int | None:
+    if value is None or value == '':
+        return None
+    return int(float(value))
+
+def to_float(value) -> float | None:
+    if value is None or value == '':
+        return None
+    return float(value)
+
+def to_str(value) -> str | None:
+    if value is None:
+        return None
+    # Catalog numbers like 1010 come back from excel as numbers
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+def convert_column(key: ClassKeys, values: list):
+    marker = NULL_MARKERS.get(key)
+    if marker is not None:
+        values = [None if value == marker else value for value in values]
+    if key in INT_COLUMNS:
+        return [to_int(value) for value in values]
+    if key in FLOAT_COLUMNS:
+        return [to_float(value) for value in values]
+    if key in TIME_COLUMNS:
+        return [None if value is None else parse_time(value) for value in values]
+    return [to_str(value) for value in values]
+
+def to_batch(rows: list[tuple], positions: dict[str, int]) -> pa.RecordBatch:
+    arrays = []
+    for field in SCHEMA:
+        if field.name == DAYS_COLUMN:
+            day_positions = [positions[day.value] for day in DAYS_OF_WEEK]
+            values = [
+                sum(1 << bit for bit, position in enumerate(day_positions) if row[position] == 'Y')
+                for row in rows
+            ]
+        else:
+            position = positions[field.name]
+            values = convert_column(ClassKeys(field.name), [row[position] for row in rows])
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+# Stream the workbook row by row into an Arrow IPC file, one record batch at a time
+def convert(workbook_path: str, snapshot_path: str, batch_rows: int = 10_000):
+    workbook = openpyxl.load_workbook(workbook_path, read_only=True, data_only=True)
+    tmp_path = snapshot_path + ".part"
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows)
+        positions = {name: i for i, name in enumerate(header) if name is not None}
+        missing = [key.value for key in ClassKeys if key.value not in positions]
+        if missing:
+            raise ValueError(f"Registrar workbook is missing columns: {', '.join(missing)}")
+
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, SCHEMA) as writer:
+            batch = []
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    writer.write_batch(to_batch(batch, positions))
+                    batch = []
+            if batch:
+                writer.write_batch(to_batch(batch, positions))
+    finally:
+        workbook.close()
+    os.replace(tmp_path, snapshot_path)
+
+def load(snapshot_path: str) -> pd.DataFrame:
+    with pa.memory_map(snapshot_path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+# The snapshot lives next to the workbook it came from, convert only if it isn't there yet
+def snapshot(workbook_path: str) -> pd.DataFrame:
+    snapshot_path = os.path.splitext(workbook_path)[0] + ".arrow"
+    if not os.path.exists(snapshot_path):
+        convert(workbook_path, snapshot_path)
+    return load(snapshot_path)
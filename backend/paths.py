@@ -0,0 +1,12 @@
+import os
+
+# The api, the worker and the migrations share the db and a few small files. They're all
+# resolved from one data directory so every process finds the same ones no matter where it
+# was started from. Defaults to backend/, point it elsewhere (ex. a docker volume) with
+# HUSKY_DATA_DIR. Each file can still be overridden on its own.
+DATA_DIR = os.path.abspath(os.environ.get("HUSKY_DATA_DIR", os.path.dirname(os.path.abspath(__file__))))
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+DB_PATH = data_path("husky_plan.db")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, BeforeValidator, ConfigDict
-from typing import Annotated, List, Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
+from datetime import datetime
+from typing import Annotated, List, Literal, Optional
 
 class Parent(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -55,6 +56,71 @@ class CourseSchema(Parent):
     subject_desc: Optional[str]
     catalog_number: str
     description: Optional[str]
-    min_credits: int
-    max_credits: int
-    sections: List[SectionSchema] = []
\ No newline at end of file
+    min_credits: float
+    max_credits: float
+    sections: List[SectionSchema] = []
+
+# A course is identified by its subject and catalog number, ex. CSE 1010
+class CourseKeySchema(BaseModel):
+    subject: str
+    catalog_number: str
+
+# Everything in a student's plan at once, by course and/or by section (CLASS_CLASS_NBR)
+class CourseBatchSchema(BaseModel):
+    courses: List[CourseKeySchema] = Field(default=[], max_length=100)
+    sections: List[int] = Field(default=[], max_length=100)
+
+DAY_NAMES = list(DAYS_MAPPING.values())
+
+# Constraints for the schedule generator, ex. no 8ams: earliest_start="09:00"
+class ScheduleRequestSchema(BaseModel):
+    courses: List[CourseKeySchema] = Field(min_length=1, max_length=10)
+    earliest_start: Optional[str] = Field(default=None, pattern=r"^\d{1,2}:\d{2}$")
+    blocked_days: List[Literal[tuple(DAY_NAMES)]] = []
+    min_gap: int = Field(default=0, ge=0, le=120)
+    open_seats_only: bool = False
+    limit: int = Field(default=10, ge=1, le=100)
+
+class ScheduleCourseSchema(BaseModel):
+    course: str
+    # Sections that meet at the same times, any of them works
+    section_ids: List[int]
+
+class ScheduleSchema(BaseModel):
+    rank: int
+    minutes_on_campus: int
+    sections: List[ScheduleCourseSchema]
+
+class SearchResultSchema(BaseModel):
+    subject_code: str
+    catalog_number: str
+    subject_desc: Optional[str]
+    description: Optional[str]
+    # Everyone teaching a section of the course, space separated
+    professors: Optional[str]
+
+# What an uploaded registration pdf matched in the catalog, section ids feed straight into /calendar.ics
+class ImportSchema(BaseModel):
+    sections: List[int]
+    courses: dict[str, CourseSchema]
+    # Courses found in the pdf with no matching section in the catalog
+    unmatched: List[str]
+
+class SeatsSchema(BaseModel):
+    section_id: int
+    enrollment_cap: Optional[int]
+    enrollment_total: Optional[int]
+    waitlist_cap: Optional[int]
+    waitlist_total: Optional[int]
+    open_seats: Optional[int]
+    # When these counts were first seen, they haven't changed since
+    updated_at: datetime
+
+class SeatTrendSchema(BaseModel):
+    at: datetime
+    enrollment_cap: Optional[int]
+    enrollment_total: Optional[int]
+    waitlist_cap: Optional[int]
+    waitlist_total: Optional[int]
+    # enrollment_total / enrollment_cap
+    fill_rate: Optional[float]
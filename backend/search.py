@@ -0,0 +1,73 @@
+import re
+
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# One row per course, instructors folded into a single column. Prefix indexes on 1-3 characters
+# keep typeahead queries ("cs", "intro da") from scanning the whole term list.
+CREATE_INDEX = text("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5(
+        subject_code, catalog_number, subject_desc, description, professors,
+        course_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '1 2 3'
+    )
+""")
+
+REBUILD_INDEX = text("""
+    INSERT INTO course_search (subject_code, catalog_number, subject_desc, description, professors, course_id)
+    SELECT
+        courses.subject_code,
+        courses.catalog_number,
+        courses.subject_desc,
+        courses.description,
+        (
+            SELECT group_concat(name, ' ') FROM (
+                SELECT DISTINCT professors.name
+                FROM sections
+                JOIN section_professors ON section_professors.section_id = sections.id
+                JOIN professors ON professors.id = section_professors.professor_id
+                WHERE sections.course_id = courses.id
+            )
+        ),
+        courses.id
+    FROM courses
+""")
+
+# bm25 weights, in column order: a hit on the course code beats one in the description
+SEARCH = text("""
+    SELECT subject_code, catalog_number, subject_desc, description, professors
+    FROM course_search
+    WHERE course_search MATCH :query
+    ORDER BY bm25(course_search, 10.0, 10.0, 2.0, 4.0, 3.0), subject_code, catalog_number
+    LIMIT :limit OFFSET :offset
+""")
+
+def create_index(engine: Engine):
+    with engine.begin() as connection:
+        connection.execute(CREATE_INDEX)
+
+# Runs inside the refresh's transaction so the index and the catalog change together
+def rebuild_index(connection: Connection | Session):
+    connection.execute(CREATE_INDEX)
+    connection.execute(text("DELETE FROM course_search"))
+    connection.execute(REBUILD_INDEX)
+
+def is_empty(connection: Connection | Session) -> bool:
+    return connection.execute(text("SELECT 1 FROM course_search LIMIT 1")).first() is None
+
+# Every word must match, the last one as a prefix so results show up while typing.
+# Words are quoted so user input can't inject FTS5 operators.
+def to_match_query(query: str) -> str | None:
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+async def search_courses(db: AsyncSession, query: str, limit: int = 20, offset: int = 0):
+    match = to_match_query(query)
+    if match is None:
+        return []
+    return (await db.execute(SEARCH, {"query": match, "limit": limit, "offset": offset})).mappings().all()
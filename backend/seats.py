@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+import time
+from typing import Optional
+
+from sqlalchemy import Select, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models import SeatCount, Section
+
+# Enrollment history lives in seat_counts, appended to by every refresh (ingest.record_seats).
+# A row is only written when a section's counts differ from its last row, so the table is a
+# step function per section: unchanged counts cost nothing and the last row is always current.
+# Rows are append-only, so the highest id for a section is its latest. History outlives the
+# section: once one drops out of the catalog its last row is no longer current.
+
+SEAT_COLUMNS = ["enrollment_cap", "enrollment_total", "waitlist_cap", "waitlist_total"]
+INTERVALS = {"hour": 60 * 60, "day": 24 * 60 * 60}
+
+seat_counts = SeatCount.__table__
+
+def latest_ids(section_ids: Optional[list[int]] = None) -> Select:
+    query = select(func.max(SeatCount.id)).group_by(SeatCount.section_id)
+    if section_ids is not None:
+        query = query.where(SeatCount.section_id.in_(section_ids))
+    return query
+
+def to_datetime(recorded_at: int) -> datetime:
+    return datetime.fromtimestamp(recorded_at, timezone.utc)
+
+def fill_rate(total: Optional[int], cap: Optional[int]) -> Optional[float]:
+    if total is None or not cap:
+        return None
+    return round(total / cap, 4)
+
+# Latest counts for many sections still in the catalog in one indexed query, plus when they last changed
+async def current(db: AsyncSession, section_ids: list[int]) -> list[dict]:
+    rows = await db.execute(
+        select(seat_counts)
+        .join(Section, Section.id == SeatCount.section_id)
+        .where(SeatCount.id.in_(latest_ids(section_ids)))
+        .order_by(SeatCount.section_id)
+    )
+    return [
+        {
+            "section_id": row.section_id,
+            **{column: getattr(row, column) for column in SEAT_COLUMNS},
+            "open_seats": None if row.enrollment_cap is None or row.enrollment_total is None
+                else max(row.enrollment_cap - row.enrollment_total, 0),
+            "updated_at": to_datetime(row.recorded_at),
+        }
+        for row in rows
+    ]
+
+def trend_point(at: int, row) -> dict:
+    return {
+        "at": to_datetime(at),
+        **{column: getattr(row, column) for column in SEAT_COLUMNS},
+        "fill_rate": fill_rate(row.enrollment_total, row.enrollment_cap),
+    }
+
+# Counts at every `interval` from `days` ago until now. The history only has the changes, so
+# each point carries forward the last change at or before it. Empty if the section has no history.
+async def trend(db: AsyncSession, section_id: int, days: int, interval: int, now: Optional[int] = None) -> list[dict]:
+    now = now or int(time.time())
+    since = now - days * INTERVALS["day"]
+    since -= since % interval
+
+    # Whatever was current at `since` anchors the series
+    anchor = (
+        select(func.max(SeatCount.id))
+        .where((SeatCount.section_id == section_id) & (SeatCount.recorded_at <= since))
+        .scalar_subquery()
+    )
+    rows = (
+        await db.execute(
+            select(seat_counts)
+            .where((SeatCount.section_id == section_id) & or_(SeatCount.recorded_at > since, SeatCount.id == anchor))
+            .order_by(SeatCount.id)
+        )
+    ).all()
+
+    points, index, last = [], 0, None
+    for at in range(since, now + 1, interval):
+        while index < len(rows) and rows[index].recorded_at <= at:
+            last = rows[index]
+            index += 1
+        if last is not None:
+            points.append(trend_point(at, last))
+    # Always end on the latest counts, even mid-interval
+    if rows and rows[-1] is not last:
+        points.append(trend_point(rows[-1].recorded_at, rows[-1]))
+    return points
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+
+import backend.metrics as metrics
+from backend.cache import CatalogVersion
+from backend.constants.courses import DAYS_OF_WEEK
+from backend.database import engine as default_engine
+from backend.models import Course as CourseRow, Meeting as MeetingRow, Professor as ProfessorRow, Section as SectionRow, SectionProfessor as SectionProfessorRow
+from backend.schemas import DAY_NAMES
+
+logger = logging.getLogger('uvicorn.error')
+
+# The catalog only changes when the worker refreshes it, so the api keeps the whole thing in
+# memory as plain __slots__ records, built once per catalog version and never mutated after.
+# Days and times are decoded while building, nothing is parsed per request.
+
+class Professor:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: Optional[str]):
+        self.id = id
+        self.name = name
+
+    def as_dict(self) -> dict:
+        return {"id": self.id, "name": self.name}
+
+class SectionProfessor:
+    __slots__ = ("role", "professor")
+
+    def __init__(self, role: Optional[str], professor: Professor):
+        self.role = role
+        self.professor = professor
+
+    def as_dict(self) -> dict:
+        return {"role": self.role, "professor": self.professor.as_dict()}
+
+class Meeting:
+    # days_of_week are names for the response, day_indexes (Monday = 0) and start/end
+    # (minutes since midnight, None when unscheduled) are for the schedule generator
+    __slots__ = ("days_of_week", "day_indexes", "time_start", "time_end", "start", "end", "location")
+
+    def __init__(self, days_of_week: tuple[str, ...], day_indexes: tuple[int, ...],
+                 time_start: Optional[str], time_end: Optional[str], location: Optional[str]):
+        self.days_of_week = days_of_week
+        self.day_indexes = day_indexes
+        self.time_start = time_start
+        self.time_end = time_end
+        self.start = to_minutes(time_start)
+        self.end = to_minutes(time_end)
+        self.location = location
+
+    def as_dict(self) -> dict:
+        return {
+            "days_of_week": list(self.days_of_week),
+            "time_start": self.time_start,
+            "time_end": self.time_end,
+            "location": self.location,
+        }
+
+class Section:
+    __slots__ = ("id", "course", "section_catalog", "instruction_type", "enrollment_cap", "enrollment_total",
+                 "waitlist_cap", "waitlist_total", "professors", "meetings")
+
+    def __init__(self, row, course: "Course"):
+        self.id = row.id
+        self.course = course
+        self.section_catalog = row.section_catalog
+        self.instruction_type = row.instruction_type
+        self.enrollment_cap = row.enrollment_cap
+        self.enrollment_total = row.enrollment_total
+        self.waitlist_cap = row.waitlist_cap
+        self.waitlist_total = row.waitlist_total
+        self.professors: tuple[SectionProfessor, ...] = ()
+        self.meetings: tuple[Meeting, ...] = ()
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "section_catalog": self.section_catalog,
+            "instruction_type": self.instruction_type,
+            "enrollment_cap": self.enrollment_cap,
+            "enrollment_total": self.enrollment_total,
+            "waitlist_cap": self.waitlist_cap,
+            "waitlist_total": self.waitlist_total,
+            "professors": [professor.as_dict() for professor in self.professors],
+            "meetings": [meeting.as_dict() for meeting in self.meetings],
+        }
+
+class Course:
+    __slots__ = ("id", "subject_code", "subject_desc", "catalog_number", "description",
+                 "min_credits", "max_credits", "sections")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.subject_code = row.subject_code
+        self.subject_desc = row.subject_desc
+        self.catalog_number = row.catalog_number
+        self.description = row.description
+        # Older dbs declared these INTEGER, sqlite hands whole numbers back as ints
+        self.min_credits = None if row.min_credits is None else float(row.min_credits)
+        self.max_credits = None if row.max_credits is None else float(row.max_credits)
+        self.sections: tuple[Section, ...] = ()
+
+    @property
+    def key(self) -> str:
+        return f"{self.subject_code} {self.catalog_number}"
+
+    # Same shape as CourseSchema
+    def as_dict(self) -> dict:
+        return {
+            "subject_code": self.subject_code,
+            "subject_desc": self.subject_desc,
+            "catalog_number": self.catalog_number,
+            "description": self.description,
+            "min_credits": self.min_credits,
+            "max_credits": self.max_credits,
+            "sections": [section.as_dict() for section in self.sections],
+        }
+
+# Compact json, byte for byte what pydantic's model_dump_json would write
+def dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+# "HH:MM:SS" -> minutes since midnight
+def to_minutes(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    hours, minutes = value.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+class Catalog:
+    def __init__(self, version: int, courses: dict[tuple[str, str], Course], sections: dict[int, Section]):
+        self.version = version
+        self.courses = courses
+        self.sections = sections
+
+    def course(self, subject: str, catalog_number: str) -> Optional[Course]:
+        return self.courses.get((subject, catalog_number))
+
+    # Courses asked for by key plus the courses owning any of the sections, each once, in catalog order
+    def lookup(self, keys: Iterable[tuple[str, str]], section_ids: Iterable[int]) -> list[Course]:
+        found = {}
+        for key in keys:
+            course = self.courses.get(key)
+            if course is not None:
+                found[course.id] = course
+        for section_id in section_ids:
+            section = self.sections.get(section_id)
+            if section is not None:
+                found[section.course.id] = section.course
+        return sorted(found.values(), key=lambda course: course.id)
+
+    # Bytes held by each record type: the record, its tuples and the values in its slots.
+    # Shared values (interned strings, decoded day tuples, professors) are counted once,
+    # under the first record type that reaches them.
+    def footprint(self) -> dict[str, int]:
+        seen: set[int] = set()
+
+        def size(*values) -> int:
+            total = 0
+            for value in values:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+            return total
+
+        def record(value, slots: Iterable[str]) -> int:
+            return size(value) + sum(size(getattr(value, slot)) for slot in slots)
+
+        meetings = [meeting for section in self.sections.values() for meeting in section.meetings]
+        links = [link for section in self.sections.values() for link in section.professors]
+        report = {
+            "indexes": size(self.courses, self.sections) + sum(size(*key) for key in self.courses),
+            "courses": sum(record(course, Course.__slots__) for course in self.courses.values()),
+            "sections": sum(record(section, Section.__slots__[2:]) for section in self.sections.values()),
+            "meetings": sum(
+                record(meeting, Meeting.__slots__) + size(*meeting.days_of_week, *meeting.day_indexes)
+                for meeting in meetings
+            ),
+            "professors": sum(
+                record(link, SectionProfessor.__slots__) + record(link.professor, Professor.__slots__)
+                for link in links
+            ),
+        }
+        report["total"] = sum(report.values())
+        return report
+
+    def counts(self) -> dict[str, int]:
+        return {
+            "courses": len(self.courses),
+            "sections": len(self.sections),
+            "meetings": sum(len(section.meetings) for section in self.sections.values()),
+            "section_professors": sum(len(section.professors) for section in self.sections.values()),
+        }
+
+# Meetings store days as concatenated ClassKeys, ex. "CLASSM_MONDAYCLASSM_WEDNESDAY".
+# There are only a handful of distinct strings so each is decoded once and the tuples are shared.
+def day_decoder():
+    decoded = {}
+
+    def decode(days_of_week: Optional[str]) -> tuple[tuple[str, ...], tuple[int, ...]]:
+        if days_of_week not in decoded:
+            indexes = tuple(i for i, day in enumerate(DAYS_OF_WEEK) if days_of_week and day.value in days_of_week)
+            decoded[days_of_week] = (tuple(DAY_NAMES[i] for i in indexes), indexes)
+        return decoded[days_of_week]
+
+    return decode
+
+# One plain select per table, no ORM identity map, then everything is linked up in memory.
+# All of it is plain blocking python that grows with the catalog, the api runs it in a thread.
+def load_catalog(version: int, engine=default_engine) -> Catalog:
+    with engine.connect() as connection:
+        professor_rows = connection.execute(select(ProfessorRow.__table__)).all()
+        course_rows = connection.execute(select(CourseRow.__table__).order_by(CourseRow.id)).all()
+        section_rows = connection.execute(select(SectionRow.__table__).order_by(SectionRow.id)).all()
+        link_rows = connection.execute(select(SectionProfessorRow.__table__).order_by(SectionProfessorRow.id)).all()
+        meeting_rows = connection.execute(select(MeetingRow.__table__).order_by(MeetingRow.id)).all()
+
+    # Locations, roles, instruction types and times repeat across thousands of rows
+    intern = lambda value: sys.intern(value) if isinstance(value, str) else value
+
+    professors = {row.id: Professor(row.id, intern(row.name)) for row in professor_rows}
+    courses_by_id = {row.id: Course(row) for row in course_rows}
+    for course in courses_by_id.values():
+        course.subject_code = intern(course.subject_code)
+        course.subject_desc = intern(course.subject_desc)
+
+    sections: dict[int, Section] = {}
+    course_sections: dict[int, list[Section]] = {}
+    for row in section_rows:
+        course = courses_by_id.get(row.course_id)
+        if course is None:
+            continue
+        section = Section(row, course)
+        section.instruction_type = intern(section.instruction_type)
+        sections[row.id] = section
+        course_sections.setdefault(course.id, []).append(section)
+
+    section_links: dict[int, list[SectionProfessor]] = {}
+    for row in link_rows:
+        if row.section_id in sections and row.professor_id in professors:
+            section_links.setdefault(row.section_id, []).append(SectionProfessor(intern(row.role), professors[row.professor_id]))
+
+    decode = day_decoder()
+    section_meetings: dict[int, list[Meeting]] = {}
+    for row in meeting_rows:
+        if row.section_id in sections:
+            names, indexes = decode(row.days_of_week)
+            meeting = Meeting(names, indexes, intern(row.time_start), intern(row.time_end), intern(row.location))
+            section_meetings.setdefault(row.section_id, []).append(meeting)
+
+    for section_id, section in sections.items():
+        section.professors = tuple(section_links.get(section_id, ()))
+        section.meetings = tuple(section_meetings.get(section_id, ()))
+    for course_id, course in courses_by_id.items():
+        course.sections = tuple(course_sections.get(course_id, ()))
+
+    courses = {(course.subject_code, course.catalog_number): course for course in courses_by_id.values()}
+    return Catalog(version, courses, sections)
+
+def log_report(catalog: Catalog, seconds: float):
+    records = catalog.counts()
+    counts = ", ".join(f"{count} {name}" for name, count in records.items())
+    footprint = catalog.footprint()
+    metrics.catalog_version.set(catalog.version)
+    for name, count in records.items():
+        metrics.catalog_records.set(count, record=name)
+    for name, size in footprint.items():
+        metrics.catalog_bytes.set(size, record=name)
+    sizes = ", ".join(f"{name} {size / 1024 / 1024:.1f}MB" for name, size in footprint.items() if name != "total")
+    logger.info(
+        f"Catalog snapshot v{catalog.version}: {counts} in {seconds:.2f}s, "
+        f"{footprint['total'] / 1024 / 1024:.1f}MB ({sizes})"
+    )
+
+# Loads a snapshot and reports its size, the footprint walks every record so it's done here too
+def build_catalog(version: int, engine=default_engine) -> Catalog:
+    started = time.perf_counter()
+    catalog = load_catalog(version, engine)
+    log_report(catalog, time.perf_counter() - started)
+    return catalog
+
+# Holds the snapshot the api serves. When the worker bumps the catalog version a new snapshot
+# is built in a thread and swapped in whole on the loop; requests keep getting the old one until then.
+class CatalogStore:
+    def __init__(self, version: CatalogVersion | None = None, engine=default_engine):
+        self.version = version or CatalogVersion()
+        self.engine = engine
+        self.catalog: Optional[Catalog] = None
+        self.building: Optional[asyncio.Task] = None
+
+    # Version of the snapshot being served, responses cached from it are keyed by this
+    def current(self) -> int:
+        return -1 if self.catalog is None else self.catalog.version
+
+    async def get(self) -> Catalog:
+        version = self.version.current()
+        if self.catalog is not None and self.catalog.version == version:
+            return self.catalog
+
+        if self.building is None:
+            self.building = asyncio.get_running_loop().create_task(self.build(version))
+        # Only the very first request has nothing to fall back on
+        if self.catalog is None:
+            await asyncio.shield(self.building)
+        return self.catalog
+
+    async def build(self, version: int):
+        try:
+            self.catalog = await asyncio.to_thread(build_catalog, version, self.engine)
+        except Exception as e:
+            logger.exception(e)
+            if self.catalog is None:
+                raise
+        finally:
+            self.building = None
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from backend.snapshot import Catalog, Course, Meeting, Section
+
+# Snapshot records built by hand, the way load_catalog links them, for tests that need a catalog
+
+def meeting(days: tuple[int, ...], start: str, end: str) -> Meeting:
+    return Meeting((), days, start, end, None)
+
+# sections: (id, section_catalog, meetings), plus any Section column to override, ex. enrollment_total
+def make_course(subject: str, catalog_number: str, sections: list[tuple], course_id: int = 1) -> Course:
+    course = Course(SimpleNamespace(
+        id=course_id, subject_code=subject, catalog_number=catalog_number,
+        subject_desc=None, description=None, min_credits=3, max_credits=3,
+    ))
+    records = []
+    for section_id, section_catalog, meetings, *extra in sections:
+        columns = dict(instruction_type="Lecture", enrollment_cap=30, enrollment_total=0, waitlist_cap=0, waitlist_total=0)
+        columns.update(extra[0] if extra else {})
+        section = Section(SimpleNamespace(id=section_id, section_catalog=section_catalog, **columns), course)
+        section.meetings = tuple(meetings)
+        records.append(section)
+    course.sections = tuple(records)
+    return course
+
+def make_catalog(*courses: Course, version: int = 1) -> Catalog:
+    return Catalog(
+        version,
+        {(course.subject_code, course.catalog_number): course for course in courses},
+        {section.id: section for course in courses for section in course.sections},
+    )
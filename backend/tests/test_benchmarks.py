@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+import signal
+
+from backend.benchmarks.process import collect, exit_reason
+
+def finish(results):
+    results.put({"scenario": "finish"})
+
+# ex. the OOM killer picking a scenario before it reports
+def die(results):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+def run_scenario(target):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=target, args=(results,))
+    process.start()
+    result = collect(process, results, poll=0.1)
+    process.join()
+    return result, process.exitcode
+
+def test_collects_a_result():
+    assert run_scenario(finish) == ({"scenario": "finish"}, 0)
+
+def test_dead_scenario_does_not_hang():
+    result, exitcode = run_scenario(die)
+    assert result is None
+    assert exit_reason(exitcode) == "killed by signal 9"
@@ -0,0 +1,74 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+
+import backend.fetch as fetch
+
+# A stand-in for the registrar: serves `body`, honours If-None-Match unless conditional is off
+class Registrar:
+    def __init__(self):
+        self.body = b"workbook v1"
+        self.etag = '"v1"'
+        self.conditional = True
+        self.requests = []
+
+@pytest.fixture
+def registrar():
+    state = Registrar()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.requests.append(dict(self.headers))
+            if state.conditional and self.headers.get("If-None-Match") == state.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(state.body)))
+            if state.conditional:
+                self.send_header("ETag", state.etag)
+            self.end_headers()
+            self.wfile.write(state.body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_address[1]}/All_Classes.xlsx"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+def test_not_modified_is_skipped(registrar, tmp_path):
+    first = fetch.download(registrar.url, str(tmp_path))
+    assert first is not None
+    assert open(first.path, "rb").read() == b"workbook v1"
+    fetch.mark_loaded(first, str(tmp_path))
+
+    assert fetch.download(registrar.url, str(tmp_path)) is None
+    assert registrar.requests[-1].get("If-None-Match") == '"v1"'
+
+def test_same_content_is_skipped_without_validators(registrar, tmp_path):
+    registrar.conditional = False
+    fetch.mark_loaded(fetch.download(registrar.url, str(tmp_path)), str(tmp_path))
+    assert fetch.download(registrar.url, str(tmp_path)) is None
+
+def test_changed_workbook_replaces_the_old_one(registrar, tmp_path):
+    first = fetch.download(registrar.url, str(tmp_path))
+    fetch.mark_loaded(first, str(tmp_path))
+
+    registrar.body, registrar.etag = b"workbook v2", '"v2"'
+    second = fetch.download(registrar.url, str(tmp_path))
+    assert second is not None and second.digest != first.digest
+    fetch.mark_loaded(second, str(tmp_path))
+    assert sorted(path.name for path in tmp_path.glob("*.xlsx")) == [f"{second.digest}.xlsx"]
+
+def test_force_downloads_an_unchanged_workbook(registrar, tmp_path):
+    fetch.mark_loaded(fetch.download(registrar.url, str(tmp_path)), str(tmp_path))
+
+    forced = fetch.download(registrar.url, str(tmp_path), force=True)
+    assert forced is not None
+    assert "If-None-Match" not in registrar.requests[-1]
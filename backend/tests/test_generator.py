@@ -0,0 +1,81 @@
+import backend.generator as generator
+from backend.snapshot import Course
+from backend.tests.catalog import make_course, meeting
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY = 0, 1, 2, 3
+
+def options(*courses: Course, constraints: generator.Constraints | None = None) -> list[generator.CourseOptions]:
+    return [generator.build_options(course, constraints or generator.Constraints()) for course in courses]
+
+# Section ids each schedule picked, best first
+def picked(schedules: list[generator.Schedule]) -> list[list[int]]:
+    return [sorted(option.section_ids[0] for _, option in schedule.choices) for schedule in schedules]
+
+def allowed_ids(course: Course, constraints: generator.Constraints) -> list[int]:
+    return sorted(section_id for option in options(course, constraints=constraints)[0].options for section_id in option.section_ids)
+
+def test_finds_the_tightest_schedule():
+    morning = make_course("CSE", "1010", [
+        (100, "001", [meeting((MONDAY, WEDNESDAY), "09:00:00", "09:50:00")]),
+        (101, "002", [meeting((MONDAY, WEDNESDAY), "14:00:00", "14:50:00")]),
+    ], course_id=1)
+    afternoon = make_course("CSE", "2050", [
+        (200, "001", [meeting((MONDAY, WEDNESDAY), "10:00:00", "10:50:00")]),
+        (201, "002", [meeting((MONDAY, WEDNESDAY), "16:00:00", "16:50:00")]),
+    ], course_id=2)
+    schedules, complete = generator.generate(options(morning, afternoon), limit=1)
+    assert complete
+    assert schedules[0].minutes == 2 * 110
+    assert picked(schedules) == [[100, 200]]
+
+def test_reports_an_exhausted_time_budget():
+    courses = [
+        make_course("CSE", f"{1000 + n}", [
+            (n * 100 + offset, f"{offset + 1:03d}", [meeting((day,), f"{hour:02d}:00:00", f"{hour:02d}:50:00")])
+            for offset, (day, hour) in enumerate((day, hour) for day in range(5) for hour in range(8, 18))
+        ], course_id=n)
+        for n in range(1, 7)
+    ]
+    _, complete = generator.generate(options(*courses), limit=10, time_budget=0)
+    assert not complete
+
+def test_earliest_start_drops_early_sections():
+    course = make_course("CSE", "1010", [
+        (100, "001", [meeting((MONDAY,), "08:00:00", "08:50:00")]),
+        (101, "002", [meeting((MONDAY,), "09:00:00", "09:50:00")]),
+        (102, "003", [meeting((MONDAY,), "08:00:00", "08:50:00"), meeting((WEDNESDAY,), "10:00:00", "10:50:00")]),
+    ])
+    assert allowed_ids(course, generator.Constraints(earliest_start=9 * 60)) == [101]
+
+def test_blocked_days_drop_sections_meeting_on_them():
+    course = make_course("CSE", "1010", [
+        (100, "001", [meeting((MONDAY, WEDNESDAY), "09:00:00", "09:50:00")]),
+        (101, "002", [meeting((TUESDAY, THURSDAY), "09:30:00", "10:45:00")]),
+    ])
+    assert allowed_ids(course, generator.Constraints(blocked_days={MONDAY})) == [101]
+
+def test_open_seats_only_drops_full_sections():
+    course = make_course("CSE", "1010", [
+        (100, "001", [meeting((MONDAY,), "09:00:00", "09:50:00")], {"enrollment_total": 30}),
+        (101, "002", [meeting((MONDAY,), "11:00:00", "11:50:00")], {"enrollment_total": 29}),
+        (102, "003", [meeting((MONDAY,), "13:00:00", "13:50:00")], {"enrollment_cap": None}),
+    ])
+    assert allowed_ids(course, generator.Constraints()) == [100, 101, 102]
+    assert allowed_ids(course, generator.Constraints(open_seats_only=True)) == [101]
+
+def test_min_gap_keeps_sections_apart():
+    first = make_course("CSE", "1010", [(100, "001", [meeting((MONDAY,), "09:00:00", "09:50:00")])], course_id=1)
+    second = make_course("CSE", "2050", [
+        (200, "001", [meeting((MONDAY,), "09:55:00", "10:45:00")]),
+        (201, "002", [meeting((MONDAY,), "10:00:00", "10:50:00")]),
+        (202, "003", [meeting((MONDAY,), "13:00:00", "13:50:00")]),
+    ], course_id=2)
+
+    def best(min_gap: int) -> list[int]:
+        schedules, _ = generator.generate(options(first, second, constraints=generator.Constraints(min_gap=min_gap)), limit=1)
+        return picked(schedules)[0]
+
+    assert best(0) == [100, 200]
+    # 9:50 -> 9:55 is too close, 9:50 -> 10:00 is exactly the gap
+    assert best(10) == [100, 201]
+    assert best(15) == [100, 202]
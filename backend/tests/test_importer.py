@@ -0,0 +1,119 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+import backend.importer as importer
+from backend.benchmarks.registration_pdf import write_pdf
+from backend.snapshot import Catalog
+from backend.tests.catalog import make_catalog, make_course
+
+# {(subject, catalog_number): [(class number, section), ...]}
+def catalog_of(sections: dict[tuple[str, str], list[tuple[int, str]]]) -> Catalog:
+    return make_catalog(*(
+        make_course(subject, catalog_number, [(section_id, section, ()) for section_id, section in rows], course_id)
+        for course_id, ((subject, catalog_number), rows) in enumerate(sections.items(), start=1)
+    ))
+
+# Laid out like registration_pdf.schedule_lines, with the term header on top
+def schedule(*classes: tuple[str, int, str]) -> list[str]:
+    lines = ["My Class Schedule", "Fall 2025 | Undergraduate | University of Connecticut", ""]
+    for course, class_number, section_catalog in classes:
+        lines += [
+            f"{course} - Synthetic",
+            "Status Units Grading Deadlines",
+            "Enrolled 3.00 Graded",
+            "Class Nbr Section Component Days & Times Room Instructor Start/End Date",
+            f"{class_number} {section_catalog} Lecture MoWe 9:05AM - 9:55AM MONT 104 Staff 08/25/2025 - 12/12/2025",
+            "",
+        ]
+    return lines
+
+def import_pdf(tmp_path, catalog: Catalog, lines: list[str]):
+    path = tmp_path / "schedule.pdf"
+    write_pdf(str(path), lines)
+
+    async def run():
+        try:
+            return await importer.extract(path.read_bytes())
+        finally:
+            importer.shutdown()
+
+    sections, unmatched = importer.match(catalog, asyncio.run(run()))
+    return sorted(section.id for section in sections), unmatched
+
+def test_matches_class_numbers_and_section_labels(tmp_path):
+    catalog = catalog_of({
+        ("CSE", "1010"): [(12345, "001"), (12346, "002")],
+        ("MATH", "2110Q"): [(23456, "010")],
+    })
+    # The MATH class number is wrong, its section label still finds it
+    ids, unmatched = import_pdf(tmp_path, catalog, schedule(("CSE 1010", 12346, "002"), ("MATH 2110Q", 99999, "010")))
+    assert ids == [12346, 23456]
+    assert unmatched == []
+
+def test_term_year_is_not_a_class_number(tmp_path):
+    # A section whose class number is the term's year
+    catalog = catalog_of({
+        ("CSE", "1010"): [(12345, "001")],
+        ("HIST", "1300"): [(2025, "001")],
+    })
+    ids, unmatched = import_pdf(tmp_path, catalog, schedule(("CSE 1010", 12345, "001")))
+    assert ids == [12345]
+    assert unmatched == []
+
+def test_year_like_class_number_with_its_section(tmp_path):
+    catalog = catalog_of({("HIST", "1300"): [(2025, "001"), (2026, "002")]})
+    ids, _ = import_pdf(tmp_path, catalog, schedule(("HIST 1300", 2026, "002")))
+    assert ids == [2026]
+
+def test_unknown_course_is_reported(tmp_path):
+    catalog = catalog_of({("CSE", "1010"): [(12345, "001")]})
+    ids, unmatched = import_pdf(tmp_path, catalog, schedule(("CSE 1010", 12345, "001"), ("PHYS 1201Q", 34567, "001")))
+    assert ids == [12345]
+    assert unmatched == ["PHYS 1201Q"]
+
+def test_rejects_non_pdf():
+    with pytest.raises(importer.UnreadablePdf):
+        asyncio.run(importer.extract(b"not a pdf"))
+
+def test_recovers_from_a_dead_worker(tmp_path):
+    catalog = catalog_of({("CSE", "1010"): [(12345, "001")]})
+    path = tmp_path / "schedule.pdf"
+    write_pdf(str(path), schedule(("CSE 1010", 12345, "001")))
+
+    async def run():
+        try:
+            await importer.extract(path.read_bytes())
+            # ex. the OOM killer picking a pdf worker between uploads
+            broken = importer.pool
+            for pid in list(broken._processes):
+                os.kill(pid, signal.SIGKILL)
+            lines = await importer.extract(path.read_bytes())
+            assert importer.pool is not broken
+            return lines
+        finally:
+            importer.shutdown()
+
+    sections, _ = importer.match(catalog, asyncio.run(run()))
+    assert [section.id for section in sections] == [12345]
+
+# Stands in for a pdf that takes its worker down with it
+def crash_page(path: str, page_number: int):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+def test_pdf_that_crashes_the_reader(tmp_path, monkeypatch):
+    path = tmp_path / "schedule.pdf"
+    write_pdf(str(path), schedule(("CSE 1010", 12345, "001")))
+    monkeypatch.setattr(importer, "extract_page", crash_page)
+
+    async def run():
+        try:
+            with pytest.raises(importer.ReaderCrashed):
+                await importer.extract(path.read_bytes())
+        finally:
+            importer.shutdown()
+
+    asyncio.run(run())
+    assert importer.pool is None
@@ -0,0 +1,37 @@
+import pandas as pd
+
+import backend.ingest as ingest, backend.models as models
+
+def no_changes() -> dict[str, ingest.TableDiff]:
+    return {name: ingest.TableDiff([], [], []) for name in ingest.TABLE_MODELS}
+
+def test_diff_reports_changed_columns():
+    old = pd.DataFrame({"id": [1, 2], "enrollment_total": [10, 20], "course_id": [5, 5]})
+    new = pd.DataFrame({"id": [1, 2], "enrollment_total": [11, 20], "course_id": [5, 5]})
+    changes = ingest.diff(old, new, ["id"])
+    assert [row["id"] for row in changes.updates] == [1]
+    assert changes.changed == {"enrollment_total"}
+
+def test_seat_count_changes_leave_search_alone():
+    diffs = no_changes()
+    diffs["sections"] = ingest.TableDiff([], [{"id": 1}], [], [{"enrollment_total", "waitlist_total"}])
+    diffs["meetings"] = ingest.TableDiff([{"section_id": 1}], [], [3])
+    assert not ingest.changes_search(diffs)
+
+def test_searchable_changes_rebuild_search():
+    for name, changes in [
+        ("courses", ingest.TableDiff([], [{"id": 1}], [], [{"description"}])),
+        ("professors", ingest.TableDiff([{"id": 1}], [], [])),
+        ("section_professors", ingest.TableDiff([], [], [4])),
+        ("sections", ingest.TableDiff([], [{"id": 1}], [], [{"course_id"}])),
+        ("sections", ingest.TableDiff([{"id": 2}], [], [])),
+    ]:
+        diffs = no_changes()
+        diffs[name] = changes
+        assert ingest.changes_search(diffs), name
+
+def test_coerce_keeps_fractional_units():
+    frame = pd.DataFrame({"min_credits": pd.Series([1.5, 3.0], dtype="float32"), "max_credits": pd.Series([3.3, 4.0], dtype="float32")})
+    courses = ingest.coerce(frame, models.Course)
+    assert courses["min_credits"].tolist() == [1.5, 3.0]
+    assert courses["max_credits"].tolist() == [3.3, 4.0]
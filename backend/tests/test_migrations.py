@@ -0,0 +1,21 @@
+from sqlalchemy import create_engine, inspect
+
+import backend.migrations as migrations
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'husky_plan.db'}")
+    migrations.migrate(engine, lock_path=str(tmp_path / "migrate.lock"))
+    try:
+        assert migrations.full_scans(engine) == {name: [] for name in migrations.hot_queries()}
+    finally:
+        engine.dispose()
+
+def test_migrate_is_repeatable(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'husky_plan.db'}")
+    lock_path = str(tmp_path / "migrate.lock")
+    migrations.migrate(engine, lock_path=lock_path)
+    migrations.migrate(engine, lock_path=lock_path)
+    try:
+        assert "ix_seat_counts_section_id_recorded_at" in {index["name"] for index in inspect(engine).get_indexes("seat_counts")}
+    finally:
+        engine.dispose()
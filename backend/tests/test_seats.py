@@ -0,0 +1,110 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+import backend.ingest as ingest, backend.migrations as migrations, backend.models as models, backend.seats as seats
+
+HOUR = seats.INTERVALS["hour"]
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "husky_plan.db"
+    engine = create_engine(f"sqlite:///{path}")
+    migrations.migrate(engine, lock_path=str(tmp_path / "migrate.lock"))
+    engine.dispose()
+    return path
+
+def section(section_id: int, enrollment_total: int, **columns) -> dict:
+    return {
+        "id": section_id, "course_id": 1, "section_catalog": "001", "instruction_type": "Lecture",
+        "enrollment_cap": 30, "enrollment_total": enrollment_total, "waitlist_cap": 0, "waitlist_total": 0,
+        **columns,
+    }
+
+def seat_count(section_id: int, recorded_at: int, enrollment_total: int) -> dict:
+    return {
+        "section_id": section_id, "recorded_at": recorded_at,
+        "enrollment_cap": 30, "enrollment_total": enrollment_total, "waitlist_cap": 0, "waitlist_total": 0,
+    }
+
+def store(db_path, sections: list[dict], history: list[dict]):
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as db, db.begin():
+        if sections:
+            db.execute(insert(models.Section), sections)
+        if history:
+            db.execute(insert(models.SeatCount), history)
+    engine.dispose()
+
+def query(db_path, read):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        try:
+            async with AsyncSession(engine) as db:
+                return await read(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+def recorded(db_path) -> list[tuple[int, int]]:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as db:
+        rows = db.execute(select(models.SeatCount.section_id, models.SeatCount.enrollment_total).order_by(models.SeatCount.id)).all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+def record(db_path, changes: ingest.TableDiff, current: list[dict]) -> int:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as db, db.begin():
+        count = ingest.record_seats(db, changes, pd.DataFrame(current), recorded_at=HOUR)
+    engine.dispose()
+    return count
+
+def test_trend_carries_counts_forward(db_path):
+    now = 10 * HOUR
+    store(db_path, [section(1, 12)], [
+        seat_count(1, 0, 5),
+        seat_count(1, 3 * HOUR, 8),
+        seat_count(1, 9 * HOUR + 60, 12),
+    ])
+    points = query(db_path, lambda db: seats.trend(db, 1, days=1, interval=HOUR, now=now))
+    totals = {int(point["at"].timestamp()) // HOUR: point["enrollment_total"] for point in points}
+    # Nothing changed between 3:00 and 9:01, every hour in between repeats the 3:00 counts
+    assert [totals[hour] for hour in range(0, 11)] == [5, 5, 5, 8, 8, 8, 8, 8, 8, 8, 12]
+    assert points[-1]["enrollment_total"] == 12
+    assert points[-1]["fill_rate"] == 0.4
+
+def test_trend_ends_on_a_mid_interval_change(db_path):
+    store(db_path, [section(1, 9)], [seat_count(1, 0, 5), seat_count(1, HOUR + 60, 9)])
+    points = query(db_path, lambda db: seats.trend(db, 1, days=1, interval=seats.INTERVALS["day"], now=2 * HOUR))
+    assert [point["enrollment_total"] for point in points] == [5, 9]
+    assert int(points[-1]["at"].timestamp()) == HOUR + 60
+
+def test_trend_without_history(db_path):
+    assert query(db_path, lambda db: seats.trend(db, 1, days=1, interval=HOUR, now=HOUR)) == []
+
+def test_current_skips_removed_sections(db_path):
+    # Section 2 dropped out of the catalog, its history stays behind
+    store(db_path, [section(1, 8)], [seat_count(1, 0, 5), seat_count(2, 0, 30), seat_count(1, HOUR, 8)])
+    rows = query(db_path, lambda db: seats.current(db, [1, 2]))
+    assert [(row["section_id"], row["enrollment_total"], row["open_seats"]) for row in rows] == [(1, 8, 22)]
+
+def test_first_refresh_records_every_section(db_path):
+    sections = [section(1, 5), section(2, 10)]
+    assert record(db_path, ingest.TableDiff([], [], []), sections) == 2
+    assert recorded(db_path) == [(1, 5), (2, 10)]
+
+def test_records_only_seat_changes(db_path):
+    store(db_path, [], [seat_count(1, 0, 5), seat_count(2, 0, 10)])
+    changes = ingest.TableDiff(
+        [section(3, 1)],
+        [section(1, 6), section(2, 10, course_id=2)],
+        [],
+        [{"enrollment_total"}, {"course_id"}],
+    )
+    assert record(db_path, changes, [section(1, 6), section(2, 10, course_id=2), section(3, 1)]) == 2
+    assert recorded(db_path)[2:] == [(3, 1), (1, 6)]
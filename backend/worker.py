@@ -0,0 +1,116 @@
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from contextlib import contextmanager
+import argparse
+import fcntl
+import logging
+import os
+import time
+
+import backend.cache as cache, backend.fetch as fetch, backend.ingest as ingest, backend.metrics as metrics, backend.migrations as migrations, backend.parse as parse, backend.search as search
+from backend.database import SessionLocal, engine
+from backend.paths import data_path
+
+# Refreshes run here, in their own process, so the api never parses or writes the catalog
+logger = logging.getLogger('uvicorn.error')
+
+# Shared by every worker process on the machine, whoever holds it is the one refreshing
+LOCK_PATH = os.environ.get("HUSKY_LOCK_PATH", data_path("husky_plan.lock"))
+
+@contextmanager
+def refresh_lock(path: str = LOCK_PATH):
+    with open(path, "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Publish how the refresh went for the api's /metrics
+def record_refresh(timer: ingest.StageTimer, result: str):
+    for stage in timer.stages.values():
+        metrics.refresh_stage_seconds.observe(stage.seconds, stage=stage.name)
+        for direction, rows in (("in", stage.rows_in), ("out", stage.rows_out)):
+            if rows is not None:
+                metrics.refresh_stage_rows.set(rows, stage=stage.name, direction=direction)
+    metrics.refreshes.inc(result=result)
+    metrics.last_refresh.set(time.time(), result=result)
+    try:
+        metrics.registry.write()
+    except OSError as e:
+        logger.warning(f"Could not write metrics: {e}")
+
+# The cron job for fetching courses
+def fetch_courses():
+    with refresh_lock() as acquired:
+        if not acquired:
+            logger.debug("Another worker is already refreshing, skipping")
+            return
+
+        logger.debug("Fetching courses...")
+        timer = ingest.StageTimer()
+        result = "error"
+        try:
+            with timer.stage("download"):
+                # A new or emptied db needs the workbook even if the registrar's copy hasn't changed
+                with SessionLocal() as db:
+                    empty = ingest.is_empty(db)
+                download = fetch.download(force=empty)
+
+            # Nothing changed since the last refresh, skip parsing entirely
+            if download is None:
+                result = "unchanged"
+                return
+
+            with timer.stage("parse") as stage:
+                data = parse.snapshot(download.path)
+                stage.rows_out = len(data)
+
+            # Normalize and insert data
+            db = SessionLocal()
+            try:
+                ingest.load_courses(db, data, timer)
+            finally:
+                db.close()
+            fetch.mark_loaded(download)
+            # Tell the api its cached responses are stale
+            cache.bump_version()
+
+            result = "ok"
+            logger.debug(f"Fetched courses: {timer.report()}")
+
+        except Exception as e:
+            logger.exception(e)
+            logger.debug(f"Refresh failed after: {timer.report()}")
+        finally:
+            record_refresh(timer, result)
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the course catalog in sync with the registrar")
+    parser.add_argument("--once", action="store_true", help="refresh once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logger.setLevel(logging.DEBUG)
+    metrics.registry.namespace = "husky_worker"
+    metrics.instrument(engine)
+
+    migrations.migrate(engine)
+    with engine.begin() as connection:
+        if search.is_empty(connection):
+            search.rebuild_index(connection)
+
+    fetch_courses()
+    if args.once:
+        return
+
+    scheduler = BlockingScheduler()
+    scheduler.add_job(fetch_courses, CronTrigger(second='0'), max_instances=1, coalesce=True)
+    scheduler.start()
+
+if __name__ == '__main__':
+    main()